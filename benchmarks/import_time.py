@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark
+Measures CLI startup cost by parsing `python -X importtime` output for
+`import cursor_wrapped.main`, and checks that the heavy dependencies stay
+out of the startup path.
+
+Usage:
+    python benchmarks/import_time.py [--runs 5] [--top 10] [--max-ms 150]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULE = "cursor_wrapped.main"
+
+# These should only load on the code paths that use them
+LAZY_MODULES = ["selenium", "PIL", "requests", "urllib3", "keyring", "numpy"]
+
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def run_once():
+    """Import MODULE in a fresh interpreter.
+
+    Returns [(module, self_us, cumulative_us, depth)] for MODULE and
+    everything it pulled in, in the order -X importtime reports them.
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {MODULE}"],
+        capture_output=True, text=True, env=env, check=True
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        depth = (len(indent) - 1) // 2
+        if depth == 0 and name != MODULE:
+            # Interpreter startup (site etc.) - not part of our import
+            timings = []
+            continue
+        timings.append((name, int(self_us), int(cumulative_us), depth))
+        if name == MODULE:
+            break
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cursor-wrapped import time")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to time (default: 5)")
+    parser.add_argument("--top", type=int, default=10, help="heaviest imports to list (default: 10)")
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if the median exceeds this")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    totals = [run[-1][2] / 1000 for run in runs]
+    median = statistics.median(totals)
+
+    print(f"import {MODULE}: median {median:.1f} ms "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}, {args.runs} runs)")
+
+    # Heaviest direct imports (by cumulative time) from the median run
+    run = runs[totals.index(sorted(totals)[len(totals) // 2])]
+    direct = [(name, cumulative_us) for name, _, cumulative_us, depth in run if depth == 1]
+    print("\nHeaviest imports:")
+    for name, cumulative_us in sorted(direct, key=lambda x: -x[1])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    loaded = sorted({entry[0].split(".")[0] for run in runs for entry in run} & set(LAZY_MODULES))
+    failed = False
+    if loaded:
+        print(f"\nFAIL: loaded at startup but should be lazy: {', '.join(loaded)}")
+        failed = True
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"\nFAIL: median {median:.1f} ms is over the {args.max_ms:.1f} ms budget")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Parallel analysis benchmark
+Times analyze_token_usage over a large synthetic event set on 1, 2, 4, ...
+processes and reports the speedup and scaling efficiency (speedup divided
+by the number of processes) for each core count.
+
+Usage:
+    python benchmarks/parallel_analysis.py [--events 2000000] [--runs 3] [--raw] [--no-numpy]
+                                           [--processes 1,2,4,8]
+
+--raw feeds raw API event dicts (parsed in the workers) instead of an
+EventTable; --no-numpy measures the array-module fallback.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODELS = ["claude-4.5-sonnet", "gpt-5", "auto", "claude-4.5-opus", "gemini-2.5-pro", "composer-1"]
+
+
+def make_events(n, seed=0):
+    """n raw usage events shaped like usageEventsDisplay entries."""
+    rng = random.Random(seed)
+    start = 1735718400000
+    return [
+        {
+            'timestamp': str(start + i * 15_000),
+            'model': rng.choice(MODELS),
+            'kind': 'USAGE_EVENT_KIND_INCLUDED_IN_PRO',
+            'tokenUsage': {
+                'inputTokens': rng.randint(0, 40_000),
+                'outputTokens': rng.randint(0, 4_000),
+                'cacheWriteTokens': rng.randint(0, 20_000),
+                'cacheReadTokens': rng.randint(0, 400_000),
+                'totalCents': rng.random() * 20
+            }
+        }
+        for i in range(n)
+    ]
+
+
+def process_counts():
+    counts = [1]
+    while counts[-1] * 2 <= (os.cpu_count() or 1):
+        counts.append(counts[-1] * 2)
+    if counts[-1] != (os.cpu_count() or 1):
+        counts.append(os.cpu_count())
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=2_000_000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--raw", action="store_true", help="analyze raw event dicts instead of an EventTable")
+    parser.add_argument("--no-numpy", action="store_true", help="use the array-module fallback")
+    parser.add_argument("--processes", help="comma-separated process counts (default: powers of two up to the CPU count)")
+    args = parser.parse_args()
+
+    if args.no_numpy:
+        # Read by every worker process too
+        os.environ["CURSOR_WRAPPED_NO_NUMPY"] = "1"
+
+    from cursor_wrapped.columnar import EventTable, get_numpy
+    from cursor_wrapped.main import analyze_token_usage
+
+    print(f"Generating {args.events:,} events...")
+    events = make_events(args.events)
+    if not args.raw:
+        events = EventTable.from_events(events)
+    backend = "numpy" if get_numpy() else "array fallback"
+    print(f"Input: {'raw dicts' if args.raw else 'EventTable'}, reductions: {backend}, "
+          f"{os.cpu_count()} CPUs\n")
+
+    expected = None
+    baseline = None
+    print(f"{'processes':>9}  {'median':>9}  {'speedup':>8}  {'efficiency':>10}")
+    counts = [int(n) for n in args.processes.split(",")] if args.processes else process_counts()
+    for processes in counts:
+        times = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            stats = analyze_token_usage(events, processes)
+            times.append(time.perf_counter() - started)
+
+        # Every process count must give the same answer
+        summary = (stats['event_count'], stats['total_input_tokens'], round(stats['total_cost_cents'], 2))
+        if expected is None:
+            expected = summary
+        elif summary != expected:
+            print(f"Result mismatch on {processes} processes: {summary} != {expected}")
+            return 1
+
+        median = statistics.median(times)
+        baseline = baseline or median
+        speedup = baseline / median
+        print(f"{processes:>9}  {median:>8.3f}s  {speedup:>7.2f}x  {speedup / processes:>9.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
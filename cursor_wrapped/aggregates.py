@@ -0,0 +1,279 @@
+"""
+Mergeable aggregates
+Partial results of the yearly and token analyses. Each aggregate can be
+built from one slice of the data and combined with others through an
+associative merge, so shards can be analyzed separately (in parallel, or
+the current month on top of the stored results for earlier ones) and
+still add up to exactly what a single pass over everything would give.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from heapq import merge as merge_sorted
+
+from cursor_wrapped.columnar import (
+    DAILY_COLUMNS, USAGE_LISTS, EventTable, any_positive, column_sum, count, day_runs, elementwise_sum, first_max,
+    group_count, group_sum, split_by_key
+)
+from cursor_wrapped.sketch import TDigest
+from cursor_wrapped.stats import DayRecord, YearlyStats
+
+# Part of every memoized analysis key (see store.AnalysisCache) - bump it
+# whenever a change here, in the rollup or in the stats shape alters results
+ANALYSIS_VERSION = 4
+
+# Per-model sums; model_costs is the first, model_tokens the rest
+MODEL_FIELDS = ['cents', 'input', 'output', 'cache_write', 'cache_read']
+
+# Per-request distributions sketched for every event -> EventTable column
+# (None for the cents column)
+SKETCHED = {'input': 'input_tokens', 'output': 'output_tokens', 'cents': None}
+
+# Smallest chunk worth shipping to a worker process
+MIN_CHUNK_EVENTS = 50_000
+
+# Legacy token stats key for each EventTable token column
+TOKEN_TOTALS = {
+    'input_tokens': 'total_input_tokens',
+    'output_tokens': 'total_output_tokens',
+    'cache_write': 'total_cache_write',
+    'cache_read': 'total_cache_read',
+}
+
+
+def add_counts(into, other):
+    """Add the {key: number} counts of other into into."""
+    for key, value in other.items():
+        into[key] = into.get(key, 0) + value
+
+
+def add_rows(into, other):
+    """Add other's {key: [numbers]} rows into into, element by element."""
+    for key, values in other.items():
+        if key in into:
+            into[key] = [a + b for a, b in zip(into[key], values)]
+        else:
+            into[key] = list(values)
+
+
+def better_day(a, b):
+    """The (value, day, ...) record with the larger value; ties go to the earlier day."""
+    if a is None or b is None:
+        return a or b
+    return a if (a[0], -a[1]) >= (b[0], -b[1]) else b
+
+
+def merge_runs(a, b):
+    """Merge two sorted lists of (first_day, length) runs of active days.
+
+    Runs that touch are joined, so splitting the days anywhere and merging
+    the pieces back in any order gives the same runs. Raises ValueError if
+    the two lists share a day.
+    """
+    runs = []
+    for first, length in merge_sorted(a, b):
+        if runs and first < runs[-1][0] + runs[-1][1]:
+            raise ValueError("streak runs cover overlapping days")
+        if runs and first == runs[-1][0] + runs[-1][1]:
+            runs[-1] = (runs[-1][0], runs[-1][1] + length)
+        else:
+            runs.append((first, length))
+    return runs
+
+
+class YearlyAggregate:
+    """Partial result of analyze_yearly_data over a set of days.
+
+    Build one per DailyTable slice with from_table, combine slices with
+    merge (slices must not share days) and turn the result into a
+    YearlyStats with to_stats.
+    """
+
+    def __init__(self):
+        self.totals = {name: 0 for name in DAILY_COLUMNS}
+        self.active_days = 0
+        self.usage = {name: {} for name in USAGE_LISTS}
+        self.busiest_day = None                 # (requests, day, lines)
+        self.best_day = None                    # (lines, day, accepted)
+        self.runs = []                          # streaks, as sorted (first_day, length)
+        self.daily = []                         # (day, date, lines_added, accepted, requests), sorted
+
+    @classmethod
+    def from_table(cls, table):
+        """Aggregate a DailyTable with vectorized reductions over its columns."""
+        agg = cls()
+        agg.totals = {name: column_sum(column) for name, column in table.columns.items()}
+        agg.usage = {name: table.usage_totals(name) for name in USAGE_LISTS}
+        if not len(table):
+            return agg
+
+        lines = elementwise_sum(table['lines_added'], table['lines_deleted'])  # Total lines worked on
+        accepted = elementwise_sum(table['accepted_lines_added'], table['accepted_lines_deleted'])
+        requests = table['agent_requests']
+        active = any_positive(lines, requests, table['tabs_shown'])
+
+        agg.active_days = count(active)
+        if not agg.active_days:
+            return agg
+
+        # Busiest day (most agent requests) and best coding day (most total lines)
+        row = first_max(requests, active)
+        agg.busiest_day = (requests[row], table.day[row], int(lines[row]))
+        row = first_max(lines, active)
+        agg.best_day = (int(lines[row]), table.day[row], int(accepted[row]))
+
+        agg.runs = day_runs(table.day, active)
+
+        agg.daily = [
+            (table.day[row], table.date[row], table['lines_added'][row], int(accepted[row]), requests[row])
+            for row in range(len(table)) if active[row]
+        ]
+        return agg
+
+    def merge(self, other):
+        """Fold another aggregate (over different days) into this one; returns self."""
+        add_counts(self.totals, other.totals)
+        self.active_days += other.active_days
+        for name, counts in other.usage.items():
+            add_counts(self.usage[name], counts)
+        self.busiest_day = better_day(self.busiest_day, other.busiest_day)
+        self.best_day = better_day(self.best_day, other.best_day)
+        self.runs = merge_runs(self.runs, other.runs)
+        self.daily = list(merge_sorted(self.daily, other.daily, key=lambda d: d[0]))
+        return self
+
+    def to_stats(self):
+        """The YearlyStats analyze_yearly_data returns."""
+        stats = YearlyStats()
+        stats.total_lines_added = self.totals['lines_added']
+        stats.total_lines_deleted = self.totals['lines_deleted']
+        stats.accepted_lines_added = self.totals['accepted_lines_added']
+        stats.accepted_lines_deleted = self.totals['accepted_lines_deleted']
+        stats.total_applies = self.totals['applies']
+        stats.total_accepts = self.totals['accepts']
+        stats.total_rejects = self.totals['rejects']
+        stats.total_tabs_shown = self.totals['tabs_shown']
+        stats.total_tabs_accepted = self.totals['tabs_accepted']
+        stats.total_agent_requests = self.totals['agent_requests']
+        stats.subscription_included_reqs = self.totals['subscription_included_reqs']
+        stats.active_days = self.active_days
+        for name, counts in self.usage.items():
+            setattr(stats, name, dict(counts))
+
+        stats.daily = list(self.daily)
+        stats.streak_current = self.runs[-1][1] if self.runs else 0
+        stats.streak_longest = max((length for _, length in self.runs), default=0)
+
+        if self.busiest_day:
+            requests, day, lines = self.busiest_day
+            stats.busiest_day = DayRecord(day, lines=lines, requests=requests)
+        if self.best_day:
+            lines, day, accepted = self.best_day
+            stats.best_day = DayRecord(day, lines=lines, accepted=accepted)
+
+        return stats
+
+
+class TokenAggregate:
+    """Partial result of analyze_token_usage over a set of usage events.
+
+    Event sets can be any split of the events (pages, chunks, time ranges).
+    Totals merge by plain addition; the per-request distributions are
+    t-digests (overall and per model), which merge within their error
+    bounds, so memory stays fixed however many events stream through.
+    """
+
+    def __init__(self):
+        self.totals = {name: 0 for name in TOKEN_TOTALS}
+        self.cents = 0
+        self.models = {}       # model name -> MODEL_FIELDS sums
+        self.event_count = 0
+        self.sketches = {name: TDigest() for name in SKETCHED}
+        self.model_sketches = {}  # model name -> {SKETCHED name: TDigest}
+
+    @classmethod
+    def from_table(cls, table):
+        """Aggregate an EventTable, grouping by interned model id."""
+        agg = cls()
+        agg.totals = {name: column_sum(table[name]) for name in TOKEN_TOTALS}
+        agg.cents = column_sum(table.cents)
+        agg.event_count = len(table)
+
+        n_models = len(table.models)
+        present = group_count(table.model, n_models)
+        columns = [group_sum(table.model, table.cents, n_models)]
+        columns += [group_sum(table.model, table[name], n_models) for name in TOKEN_TOTALS]
+        for i, model in enumerate(table.models):
+            if present[i]:
+                agg.models[model] = [column[i] for column in columns]
+
+        sketched = [table.cents if column is None else table[column] for column in SKETCHED.values()]
+        agg.sketches = {name: TDigest.from_values(values) for name, values in zip(SKETCHED, sketched)}
+        for i, values in enumerate(split_by_key(table.model, n_models, *sketched)):
+            if present[i]:
+                agg.model_sketches[table.models[i]] = {
+                    name: TDigest.from_values(column) for name, column in zip(SKETCHED, values)
+                }
+        return agg
+
+    @classmethod
+    def from_events(cls, events):
+        """Aggregate raw API events (or an EventTable)."""
+        if not isinstance(events, EventTable):
+            events = EventTable.from_events(events)
+        return cls.from_table(events)
+
+    def merge(self, other):
+        """Fold another aggregate into this one; returns self."""
+        add_counts(self.totals, other.totals)
+        self.cents += other.cents
+        add_rows(self.models, other.models)
+        self.event_count += other.event_count
+        for name, digest in other.sketches.items():
+            self.sketches[name].merge(digest)
+        for model, digests in other.model_sketches.items():
+            mine = self.model_sketches.setdefault(model, {name: TDigest() for name in SKETCHED})
+            for name, digest in digests.items():
+                mine[name].merge(digest)
+        return self
+
+    def to_stats(self):
+        """The stats dict analyze_token_usage returns."""
+        stats = {TOKEN_TOTALS[name]: total for name, total in self.totals.items()}
+        stats.update({
+            'total_cost_cents': self.cents,
+            'model_costs': {model: sums[0] for model, sums in self.models.items()},
+            'model_tokens': {model: dict(zip(MODEL_FIELDS[1:], sums[1:])) for model, sums in self.models.items()},
+            'event_count': self.event_count,
+            # Per-request percentiles: {'input'|'output'|'cents': {'p50', 'p90', 'p99'}}
+            'quantiles': {name: digest.summary() for name, digest in self.sketches.items()},
+            'model_quantiles': {
+                model: {name: digest.summary() for name, digest in digests.items()}
+                for model, digests in self.model_sketches.items()
+            }
+        })
+        return stats
+
+
+def aggregate_tokens_parallel(events, processes, chunk_size=None):
+    """TokenAggregate of events (an EventTable or raw API events), built in a process pool.
+
+    The events are split into about one chunk per process (never smaller
+    than MIN_CHUNK_EVENTS), each chunk is aggregated in a worker and the
+    results are merged here. Too few events for more than one chunk are
+    aggregated in this process.
+    """
+    n = len(events)
+    chunk_size = chunk_size or max(-(-n // max(processes, 1)), MIN_CHUNK_EVENTS)
+    if processes <= 1 or n <= chunk_size:
+        return TokenAggregate.from_events(events)
+
+    if isinstance(events, EventTable):
+        chunks = [events.slice(i, i + chunk_size) for i in range(0, n, chunk_size)]
+    else:
+        chunks = [events[i:i + chunk_size] for i in range(0, n, chunk_size)]
+
+    total = TokenAggregate()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for agg in executor.map(TokenAggregate.from_events, chunks):
+            total.merge(agg)
+    return total
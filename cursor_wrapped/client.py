@@ -0,0 +1,261 @@
+"""
+Cursor API client
+Shared keep-alive HTTP session for all dashboard API calls
+"""
+
+import random
+import threading
+import time
+
+BASE_URL = "https://cursor.com"
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36"
+
+# Default pool size - enough for one connection per fetch worker
+DEFAULT_POOL_SIZE = 10
+
+# (connect, read) timeout in seconds for each request
+DEFAULT_TIMEOUT = (10, 60)
+
+# Retries per request for throttling, server errors and dropped connections
+DEFAULT_MAX_RETRIES = 4
+
+# Backoff bounds in seconds; each retry sleeps a random time up to the bound
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 20
+
+# Status codes that mean "slow down / try again" rather than "you did it wrong"
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class AdaptiveLimiter:
+    """AIMD limit on how many requests may be in flight at once.
+
+    The limit grows by roughly one per round of successful requests while
+    latency stays near its recent average, and is cut multiplicatively on
+    throttling, server errors or a latency spike. Cuts are spaced at least
+    one round-trip apart so a burst of failures from the same window only
+    backs off once.
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=16, decrease=0.5, latency_tolerance=2.0, latency_floor=0.25):
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.latency_floor = latency_floor
+
+        self.in_flight = 0
+        self.peak = int(self.limit)
+        self.smoothed_latency = None
+        self.last_decrease = 0.0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while self.in_flight >= int(self.limit):
+                self.cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency=None, congested=False):
+        with self.cond:
+            self.in_flight -= 1
+
+            if latency is not None and not congested:
+                if self.smoothed_latency is None:
+                    self.smoothed_latency = latency
+                # Ignore jitter below the floor - a 5ms response taking 15ms
+                # is noise, not a server under load
+                congested = latency > max(self.smoothed_latency * self.latency_tolerance,
+                                          self.smoothed_latency + self.latency_floor)
+                self.smoothed_latency += (latency - self.smoothed_latency) * 0.2
+
+            now = time.monotonic()
+            if congested:
+                if now - self.last_decrease > (self.smoothed_latency or 0):
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self.last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self.peak = max(self.peak, int(self.limit))
+
+            self.cond.notify_all()
+
+
+class CursorClient:
+    """Pooled session that carries the auth cookie and common headers.
+
+    One client is shared by every fetcher (and every fetch thread), so TCP
+    and TLS handshakes happen once per pooled connection instead of once
+    per page.
+    """
+
+    def __init__(self, auth_cookie, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 max_retries=DEFAULT_MAX_RETRIES, adaptive=True, cache=None):
+        self.auth_cookie = auth_cookie
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.limiter = AdaptiveLimiter(maximum=pool_size) if adaptive else None
+        self.cache = cache
+        self.retries = 0
+        self.failures = 0
+        self.cache_hits = 0
+        self.lock = threading.Lock()
+
+        # requests is imported here rather than at module load so paths that
+        # never touch the network (offline replays) don't pay for it
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        # pool_block keeps extra threads waiting for a connection instead of
+        # opening throwaway ones past the pool size
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", self.adapter)
+
+        self.session.headers.update({
+            "accept": "*/*",
+            "accept-encoding": "gzip, deflate",
+            "connection": "keep-alive",
+            "content-type": "application/json",
+            "origin": BASE_URL,
+            "user-agent": USER_AGENT
+        })
+        self.session.cookies.set("WorkosCursorSessionToken", auth_cookie)
+
+    def post(self, path, payload, referer=f"{BASE_URL}/dashboard", timeout=None):
+        """POST a JSON payload to a dashboard API path and return the response.
+
+        429s, 5xx responses, timeouts and dropped connections are retried
+        with jittered exponential backoff. Once retries run out the last
+        response is returned (or the last error raised) for the caller to
+        handle as before.
+        """
+        from requests.exceptions import ConnectionError, Timeout
+
+        for attempt in range(self.max_retries + 1):
+            if self.limiter:
+                self.limiter.acquire()
+            started = time.monotonic()
+            response = error = None
+            try:
+                response = self.session.post(
+                    BASE_URL + path,
+                    json=payload,
+                    headers={"referer": referer},
+                    timeout=timeout or self.timeout
+                )
+            except (ConnectionError, Timeout) as e:
+                error = e
+            finally:
+                congested = error is not None or (response is not None and response.status_code in RETRYABLE_STATUSES)
+                if self.limiter:
+                    self.limiter.release(time.monotonic() - started, congested)
+
+            if not congested:
+                return response
+            if attempt == self.max_retries:
+                break
+
+            with self.lock:
+                self.retries += 1
+            time.sleep(self.retry_delay(attempt, response))
+
+        with self.lock:
+            self.failures += 1
+        if error is not None:
+            raise error
+        return response
+
+    def post_json(self, path, payload, referer=f"{BASE_URL}/dashboard"):
+        """POST a JSON payload and return the decoded body, via the response cache if set.
+
+        Raises requests.exceptions.HTTPError for error statuses, like
+        response.raise_for_status().
+        """
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(self.auth_cookie, path, payload)
+            data = self.cache.get(key)
+            if data is not None:
+                with self.lock:
+                    self.cache_hits += 1
+                return data
+
+        response = self.post(path, payload, referer=referer)
+        response.raise_for_status()
+        data = response.json()
+
+        if self.cache is not None:
+            self.cache.put(key, data, payload)
+        return data
+
+    @staticmethod
+    def retry_delay(attempt, response=None):
+        """Seconds to wait before retry number attempt + 1 ("full jitter")."""
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), RETRY_MAX_DELAY) + random.uniform(0, RETRY_BASE_DELAY)
+        return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+    def check_session(self):
+        """Cheaply check that the session token is still accepted.
+
+        Asks for a single day of analytics, bypassing retries and the cache.
+        Returns True if it is, False if the server rejects it (401/403) and
+        None if that can't be told - no network, a timeout or a server error.
+        """
+        from requests.exceptions import RequestException
+
+        now_ms = int(time.time() * 1000)
+        payload = {
+            "teamId": 0,
+            "userId": 0,
+            "startDate": str(now_ms - 86_400_000),
+            "endDate": str(now_ms)
+        }
+        try:
+            response = self.session.post(
+                BASE_URL + "/api/dashboard/get-user-analytics",
+                json=payload,
+                headers={"referer": f"{BASE_URL}/dashboard"},
+                timeout=self.timeout
+            )
+        except RequestException:
+            return None
+        if response.status_code in (401, 403):
+            return False
+        return True if response.ok else None
+
+    def connection_stats(self):
+        """Return how many requests were sent and how many connections they needed."""
+        requests_sent = 0
+        connections = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            try:
+                pool = pools[key]
+            except KeyError:
+                continue
+            requests_sent += pool.num_requests
+            connections += pool.num_connections
+
+        return {
+            'requests': requests_sent,
+            'connections': connections,
+            'reused': max(requests_sent - connections, 0)
+        }
+
+    def fetch_stats(self):
+        """Return the limiter's final and peak concurrency plus retry counts."""
+        return {
+            'concurrency': int(self.limiter.limit) if self.limiter else None,
+            'peak_concurrency': self.limiter.peak if self.limiter else None,
+            'retries': self.retries,
+            'failures': self.failures,
+            'cache_hits': self.cache_hits
+        }
+
+    def close(self):
+        self.session.close()
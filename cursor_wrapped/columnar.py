@@ -0,0 +1,471 @@
+"""
+Columnar tables
+dailyMetrics days and usage events held as typed column arrays, plus the
+reductions the analysis runs over them. NumPy does the reductions when it
+is installed; plain array-module loops are the fallback.
+"""
+
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from itertools import compress
+
+# date.toordinal() of 1970-01-01, so day numbers line up with epoch ms
+EPOCH_ORDINAL = 719163
+
+DAY_MS = 86_400_000
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Numeric column name -> dailyMetrics field
+DAILY_COLUMNS = {
+    'lines_added': 'linesAdded',
+    'lines_deleted': 'linesDeleted',
+    'accepted_lines_added': 'acceptedLinesAdded',
+    'accepted_lines_deleted': 'acceptedLinesDeleted',
+    'applies': 'totalApplies',
+    'accepts': 'totalAccepts',
+    'rejects': 'totalRejects',
+    'tabs_shown': 'totalTabsShown',
+    'tabs_accepted': 'totalTabsAccepted',
+    'agent_requests': 'agentRequests',
+    'subscription_included_reqs': 'subscriptionIncludedReqs',
+}
+
+# Per-day {name, count} lists -> (dailyMetrics field, whether unnamed
+# entries still count, as "unknown")
+USAGE_LISTS = {
+    'model_usage': ('modelUsage', True),
+    'extension_usage': ('extensionUsage', False),
+    'tab_extension_usage': ('tabExtensionUsage', False),
+    'client_versions': ('clientVersionUsage', True),
+}
+
+# Event column name -> tokenUsage field
+TOKEN_COLUMNS = {
+    'input_tokens': 'inputTokens',
+    'output_tokens': 'outputTokens',
+    'cache_write': 'cacheWriteTokens',
+    'cache_read': 'cacheReadTokens',
+}
+
+_numpy = False
+
+
+def get_numpy():
+    """Return numpy if it is installed, else None (imported on first use).
+
+    Setting $CURSOR_WRAPPED_NO_NUMPY forces the array-module fallback.
+    """
+    global _numpy
+    if _numpy is False:
+        try:
+            if os.environ.get("CURSOR_WRAPPED_NO_NUMPY"):
+                raise ImportError
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+def day_number(d):
+    """Days since 1970-01-01 for a date."""
+    return d.toordinal() - EPOCH_ORDINAL
+
+
+def day_date(day):
+    """The date for a day number."""
+    return date.fromordinal(int(day) + EPOCH_ORDINAL)
+
+
+def month_number(d):
+    """Months since year 0 for a date, so consecutive months differ by one."""
+    return d.year * 12 + d.month - 1
+
+
+def month_label(month):
+    """'YYYY-MM' for a month number."""
+    return f"{month // 12}-{month % 12 + 1:02d}"
+
+
+def vector(values):
+    """A column as a NumPy array (copied, so the column can still grow)."""
+    np = get_numpy()
+    if isinstance(values, np.ndarray):
+        return values
+    if isinstance(values, array):
+        return np.array(values, dtype=np.float64 if values.typecode == 'd' else np.int64)
+    if not len(values):
+        # asarray([]) is float64, which can't index or be bincounted
+        return np.zeros(0, dtype=np.int64)
+    return np.asarray(values)
+
+
+def column_sum(values, mask=None):
+    """Sum of a column, optionally over the rows where mask is true."""
+    np = get_numpy()
+    if np is not None:
+        v = vector(values)
+        if mask is not None:
+            v = v[vector(mask)]
+        return v.sum().item()
+    if mask is not None:
+        values = compress(values, mask)
+    return sum(values)
+
+
+def count(mask):
+    """Number of true rows in a mask."""
+    np = get_numpy()
+    if np is not None:
+        return int(np.count_nonzero(vector(mask)))
+    return sum(1 for m in mask if m)
+
+
+def elementwise_sum(*columns):
+    """Row-by-row sum of several equal-length columns."""
+    np = get_numpy()
+    if np is not None:
+        total = vector(columns[0]).copy()
+        for column in columns[1:]:
+            total += vector(column)
+        return total
+    return array('q', map(sum, zip(*columns)))
+
+
+def any_positive(*columns):
+    """Mask of the rows where at least one of the columns is > 0."""
+    np = get_numpy()
+    if np is not None:
+        mask = np.zeros(len(columns[0]), dtype=bool)
+        for column in columns:
+            mask |= vector(column) > 0
+        return mask
+    return array('b', (any(v > 0 for v in row) for row in zip(*columns)))
+
+
+def group_sum(keys, values, size, mask=None):
+    """Sums of values per key, for keys in range(size)."""
+    np = get_numpy()
+    if np is not None:
+        k = vector(keys)
+        v = vector(values)
+        if mask is not None:
+            m = vector(mask)
+            k, v = k[m], v[m]
+        totals = np.zeros(size, dtype=v.dtype)
+        np.add.at(totals, k, v)
+        return totals.tolist()
+    totals = [0] * size
+    rows = zip(keys, values) if mask is None else compress(zip(keys, values), mask)
+    for key, value in rows:
+        totals[key] += value
+    return totals
+
+
+def group_count(keys, size, mask=None):
+    """Number of rows per key, for keys in range(size)."""
+    np = get_numpy()
+    if np is not None:
+        k = vector(keys)
+        if mask is not None:
+            k = k[vector(mask)]
+        return np.bincount(k, minlength=size).tolist()
+    totals = [0] * size
+    for key in (keys if mask is None else compress(keys, mask)):
+        totals[key] += 1
+    return totals
+
+
+def split_by_key(keys, size, *columns):
+    """For each key in range(size), the values of every column on that key's rows."""
+    np = get_numpy()
+    if np is not None:
+        k = vector(keys)
+        order = np.argsort(k, kind='stable')
+        bounds = np.cumsum(np.bincount(k, minlength=size))[:-1]
+        parts = [np.split(vector(column)[order], bounds) for column in columns]
+        return [tuple(part[i] for part in parts) for i in range(size)]
+    groups = [tuple([] for _ in columns) for _ in range(size)]
+    for row, key in enumerate(keys):
+        for values, column in zip(groups[key], columns):
+            values.append(column[row])
+    return groups
+
+
+def first_max(values, mask=None):
+    """Row index of the first largest value (among masked rows), or None."""
+    np = get_numpy()
+    if np is not None:
+        v = vector(values)
+        rows = np.arange(len(v)) if mask is None else np.flatnonzero(vector(mask))
+        if not len(rows):
+            return None
+        return int(rows[v[rows].argmax()])
+    best = None
+    for row, value in enumerate(values):
+        if (mask is None or mask[row]) and (best is None or value > values[best]):
+            best = row
+    return best
+
+
+def day_runs(days, mask=None):
+    """Runs of consecutive day numbers as (first_day, length) pairs.
+
+    Days must be sorted; a repeated day ends a run like a gap does.
+    """
+    np = get_numpy()
+    if np is not None:
+        d = vector(days)
+        if mask is not None:
+            d = d[vector(mask)]
+        if not len(d):
+            return []
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(d) != 1) + 1))
+        lengths = np.diff(np.append(starts, len(d)))
+        return list(zip(d[starts].tolist(), lengths.tolist()))
+    runs = []
+    for day in (days if mask is None else compress(days, mask)):
+        if runs and day == runs[-1][0] + runs[-1][1]:
+            runs[-1][1] += 1
+        else:
+            runs.append([day, 1])
+    return [tuple(run) for run in runs]
+
+
+class UsageColumn:
+    """Sparse (row, name, count) column for one per-day usage list.
+
+    Names are interned so each entry costs three integers; rows are
+    appended in order, so a row range is a contiguous slice.
+    """
+
+    def __init__(self):
+        self.rows = array('q')
+        self.ids = array('q')
+        self.counts = array('q')
+        self.names = []
+        self.index = {}
+
+    def add(self, row, name, count):
+        name_id = self.index.get(name)
+        if name_id is None:
+            name_id = self.index[name] = len(self.names)
+            self.names.append(name)
+        self.rows.append(row)
+        self.ids.append(name_id)
+        self.counts.append(count)
+
+    def totals(self, start=0, stop=None):
+        """{name: total count} over rows [start, stop), in first-seen order."""
+        lo = bisect_left(self.rows, start)
+        hi = len(self.rows) if stop is None else bisect_left(self.rows, stop)
+        sums = group_sum(self.ids[lo:hi], self.counts[lo:hi], len(self.names))
+        present = group_count(self.ids[lo:hi], len(self.names))
+        return {name: sums[i] for i, name in enumerate(self.names) if present[i]}
+
+
+class DailyTable:
+    """dailyMetrics as columns, one row per day, sorted by date.
+
+    The day number of every row is worked out once here, so the analysis
+    never touches datetime per row.
+    """
+
+    def __init__(self):
+        self.day = array('q')        # days since 1970-01-01 (UTC)
+        self.date = []               # the API's own date value, for daily_data
+        self.columns = {name: array('q') for name in DAILY_COLUMNS}
+        self.usage = {name: UsageColumn() for name in USAGE_LISTS}
+        self.start = 0               # first row when this is a slice of a bigger table
+
+    @classmethod
+    def from_metrics(cls, metrics):
+        table = cls()
+        for row, day in enumerate(sorted(metrics, key=lambda d: int(d.get('date', 0)))):
+            date_ms = int(day.get('date', 0))
+            table.day.append(date_ms // DAY_MS)
+            table.date.append(day.get('date'))
+
+            for name, field in DAILY_COLUMNS.items():
+                table.columns[name].append(int(day.get(field) or 0))
+
+            for name, (field, keep_unnamed) in USAGE_LISTS.items():
+                for entry in day.get(field) or []:
+                    entry_name = entry.get('name', 'unknown') if keep_unnamed else entry.get('name')
+                    if entry_name or keep_unnamed:
+                        table.usage[name].add(row, entry_name, entry.get('count', 0))
+        return table
+
+    def __len__(self):
+        return len(self.day)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def slice(self, start, stop=None):
+        """Rows [start, stop) as a new table sharing the usage columns."""
+        stop = len(self) if stop is None else stop
+        table = DailyTable()
+        table.day = self.day[start:stop]
+        table.date = self.date[start:stop]
+        table.columns = {name: column[start:stop] for name, column in self.columns.items()}
+        table.usage = self.usage
+        table.start = self.start + start
+        return table
+
+    def between(self, start, end):
+        """Rows from start to end (dates, inclusive) - two binary searches and a slice."""
+        return self.slice(bisect_left(self.day, day_number(start)), bisect_right(self.day, day_number(end)))
+
+    def usage_totals(self, name):
+        """{name: count} for one of USAGE_LISTS over this table's rows."""
+        return self.usage[name].totals(self.start, self.start + len(self))
+
+
+class DateIndex:
+    """Sorted view of a timestamp column for range lookups.
+
+    Built once per table; a range is then two binary searches into the
+    sorted timestamps and a contiguous run of row numbers.
+    """
+
+    def __init__(self, timestamps):
+        np = get_numpy()
+        if np is not None:
+            ts = vector(timestamps)
+            self.order = np.argsort(ts, kind='stable')
+            self.sorted = ts[self.order]
+        else:
+            self.order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+            self.sorted = [timestamps[i] for i in self.order]
+
+    def rows(self, start_ms, end_ms):
+        """Row numbers (in time order) with start_ms <= timestamp <= end_ms."""
+        lo = bisect_left(self.sorted, start_ms)
+        hi = bisect_right(self.sorted, end_ms)
+        return self.order[lo:hi]
+
+
+class EventTable:
+    """usageEventsDisplay events as columns, in the order they were added.
+
+    Only what the analysis reads is kept: the timestamp, the model (as an
+    id into a small table of names) and the tokenUsage counts and cost -
+    about 56 bytes an event instead of a couple of KB of nested dicts.
+    extend() takes raw API events or another table, so a fetch can fill
+    one page by page and drop each page's JSON as soon as it is parsed.
+    """
+
+    def __init__(self):
+        self.timestamp = array('q')  # epoch ms
+        self.model = array('q')      # index into self.models
+        self.columns = {name: array('q') for name in TOKEN_COLUMNS}
+        self.cents = array('d')      # totalCents is fractional
+        self.models = []
+        self.model_index = {}
+        self.date_index = None
+
+    @classmethod
+    def from_events(cls, events):
+        table = cls()
+        table.extend(events)
+        return table
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def model_id(self, name):
+        model_id = self.model_index.get(name)
+        if model_id is None:
+            model_id = self.model_index[name] = len(self.models)
+            self.models.append(name)
+        return model_id
+
+    def extend(self, events):
+        """Append raw API events, or every row of another EventTable."""
+        self.date_index = None
+        if isinstance(events, EventTable):
+            ids = [self.model_id(name) for name in events.models]
+            self.timestamp.extend(events.timestamp)
+            self.model.extend(ids[m] for m in events.model)
+            for name, column in self.columns.items():
+                column.extend(events.columns[name])
+            self.cents.extend(events.cents)
+            return
+
+        for event in events:
+            token_usage = event.get('tokenUsage') or {}
+            self.timestamp.append(int(event.get('timestamp') or 0))
+            self.model.append(self.model_id(event.get('model', 'unknown')))
+            for name, field in TOKEN_COLUMNS.items():
+                self.columns[name].append(int(token_usage.get(field) or 0))
+            self.cents.append(float(token_usage.get('totalCents') or 0))
+
+    def row(self, i):
+        """One event as a (timestamp, model, input, output, cache_write, cache_read, cents) tuple."""
+        return (self.timestamp[i], self.models[self.model[i]],
+                *(self.columns[name][i] for name in TOKEN_COLUMNS), self.cents[i])
+
+    def slice(self, start, stop=None):
+        """Rows [start, stop) as a new table with the same model ids."""
+        table = EventTable()
+        table.models = list(self.models)
+        table.model_index = dict(self.model_index)
+        table.timestamp = self.timestamp[start:stop]
+        table.model = self.model[start:stop]
+        table.columns = {name: column[start:stop] for name, column in self.columns.items()}
+        table.cents = self.cents[start:stop]
+        return table
+
+    def between(self, start_ms, end_ms):
+        """Events with start_ms <= timestamp <= end_ms, via the date index.
+
+        Returns the table itself when every event is in range, else a new
+        table in time order.
+        """
+        if self.date_index is None:
+            self.date_index = DateIndex(self.timestamp)
+        rows = self.date_index.rows(start_ms, end_ms)
+        if len(rows) == len(self):
+            return self
+        return self.take(rows)
+
+    def take(self, rows):
+        """The given rows, in that order, as a new table."""
+        rows = rows.tolist() if hasattr(rows, 'tolist') else list(rows)
+        table = EventTable()
+        table.models = list(self.models)
+        table.model_index = dict(self.model_index)
+        table.timestamp = array('q', (self.timestamp[i] for i in rows))
+        table.model = array('q', (self.model[i] for i in rows))
+        table.columns = {name: array('q', (column[i] for i in rows)) for name, column in self.columns.items()}
+        table.cents = array('d', (self.cents[i] for i in rows))
+        return table
+
+    def to_json(self):
+        """Plain lists for storing the table as JSON."""
+        data = {name: column.tolist() for name, column in self.columns.items()}
+        data.update({
+            'timestamp': self.timestamp.tolist(),
+            'model': self.model.tolist(),
+            'models': self.models,
+            'cents': self.cents.tolist()
+        })
+        return data
+
+    @classmethod
+    def from_json(cls, data):
+        table = cls()
+        table.models = list(data.get('models', []))
+        table.model_index = {name: i for i, name in enumerate(table.models)}
+        table.timestamp = array('q', data.get('timestamp', []))
+        table.model = array('q', data.get('model', []))
+        table.columns = {name: array('q', data.get(name, [])) for name in TOKEN_COLUMNS}
+        table.cents = array('d', data.get('cents', []))
+        return table
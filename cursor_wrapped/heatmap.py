@@ -0,0 +1,156 @@
+"""
+Activity heatmap
+Usage events bucketed by weekday and hour of day in a chosen timezone - a
+7 x 24 grid of request counts, built in one pass over an EventTable's
+timestamp column.
+"""
+
+from datetime import datetime, timezone
+
+from cursor_wrapped.columnar import DAY_MS, WEEKDAYS, get_numpy, vector
+
+HOUR_MS = 3_600_000
+HOURS = 24
+
+# Offsets in use are whole quarter hours (+05:45 in Nepal, +12:45 on the
+# Chatham Islands) and change on a local hour or half hour, so a UTC
+# offset never changes inside one of these
+QUARTER_MS = 900_000
+
+
+def get_timezone(name=None):
+    """tzinfo for an IANA name ('Europe/Berlin'), 'UTC', or None for the local timezone.
+
+    Raises ValueError for a name the tz database doesn't know.
+    """
+    if not name:
+        return None
+    if name.upper() == 'UTC':
+        return timezone.utc
+    try:
+        from zoneinfo import ZoneInfo
+    except ImportError:
+        raise ValueError("named timezones need Python 3.9+ (zoneinfo); use UTC or the local timezone")
+    try:
+        return ZoneInfo(name)
+    except (KeyError, ValueError):
+        raise ValueError(f"unknown timezone {name!r}")
+
+
+def timezone_label(tz):
+    """Name shown for a timezone from get_timezone."""
+    if tz is None:
+        return datetime.now().astimezone().tzname() or 'local time'
+    return getattr(tz, 'key', None) or tz.tzname(None) or str(tz)
+
+
+def utc_offset_ms(ts, tz):
+    """Offset from UTC (ms) in tz at epoch ms ts."""
+    seconds = ts // 1000
+    moment = datetime.fromtimestamp(seconds, tz) if tz is not None else datetime.fromtimestamp(seconds).astimezone()
+    return int(moment.utcoffset().total_seconds() * 1000)
+
+
+def quarter_offsets(tz):
+    """A memoized quarter -> offset lookup: the UTC offset in tz during [quarter * QUARTER_MS, + QUARTER_MS).
+
+    An hour that starts and ends on the same offset keeps it throughout, so
+    its quarters share one lookup; only the hour of a switch is looked up
+    quarter by quarter.
+    """
+    hours = {}
+    quarters = {}
+
+    def hour_offset(hour):
+        if hour not in hours:
+            hours[hour] = utc_offset_ms(hour * HOUR_MS, tz)
+        return hours[hour]
+
+    def offset(quarter):
+        if quarter not in quarters:
+            hour = quarter * QUARTER_MS // HOUR_MS
+            value = hour_offset(hour)
+            if hour_offset(hour + 1) != value:
+                value = utc_offset_ms(quarter * QUARTER_MS, tz)
+            quarters[quarter] = value
+        return quarters[quarter]
+
+    return offset
+
+
+def offset_changes(tz, start_ms, end_ms):
+    """[(epoch ms, offset ms)]: the UTC offset in tz at start_ms, then each switch up to end_ms.
+
+    Switches are found to the quarter hour by checking the offset once a
+    day and bisecting the days it changed in. Two timezones with the same
+    changes over a range bucket any events in it identically, which a name
+    can't tell: local time only has an abbreviation like 'CST', shared by
+    zones on different offsets.
+    """
+    offset = quarter_offsets(tz)
+    quarter, last = start_ms // QUARTER_MS, end_ms // QUARTER_MS
+    changes = [(quarter * QUARTER_MS, offset(quarter))]
+    while quarter < last:
+        step = min(quarter + DAY_MS // QUARTER_MS, last)
+        if offset(step) == changes[-1][1]:
+            quarter = step
+            continue
+        while step - quarter > 1:
+            middle = (quarter + step) // 2
+            if offset(middle) == changes[-1][1]:
+                quarter = middle
+            else:
+                step = middle
+        changes.append((step * QUARTER_MS, offset(step)))
+        quarter = step
+    return changes
+
+
+def activity_heatmap(events, tz=None):
+    """{'timezone': label, 'counts': 7 rows (Monday first) of 24 hourly event counts}.
+
+    Every timestamp is shifted by the offset of its UTC quarter hour (see
+    quarter_offsets) - not of its hour, since some zones switch at :30 UTC
+    (America/St_Johns, Australia/Adelaide).
+    """
+    counts = [[0] * HOURS for _ in WEEKDAYS]
+    heatmap = {'timezone': timezone_label(tz), 'counts': counts}
+    if events is None or not len(events):
+        return heatmap
+
+    offset = quarter_offsets(tz)
+    np = get_numpy()
+    if np is not None:
+        ts = vector(events.timestamp)
+        quarters, inverse = np.unique(ts // QUARTER_MS, return_inverse=True)
+        offsets = np.array([offset(quarter) for quarter in quarters.tolist()], dtype=np.int64)
+        local = ts + offsets[inverse.reshape(-1)]
+        # Epoch day 0 was a Thursday (weekday 3)
+        cells = ((local // DAY_MS + 3) % 7) * HOURS + (local // HOUR_MS) % HOURS
+        grid = np.bincount(cells, minlength=7 * HOURS)
+        for w in range(7):
+            counts[w] = grid[w * HOURS:(w + 1) * HOURS].tolist()
+        return heatmap
+
+    offsets = {}
+    for ts in events.timestamp:
+        quarter = ts // QUARTER_MS
+        if quarter not in offsets:
+            offsets[quarter] = offset(quarter)
+        local = ts + offsets[quarter]
+        counts[(local // DAY_MS + 3) % 7][(local // HOUR_MS) % HOURS] += 1
+    return heatmap
+
+
+def add_heatmap(into, other):
+    """Add the counts of other (same timezone) into into; returns into."""
+    for row, other_row in zip(into['counts'], other['counts']):
+        for hour, count in enumerate(other_row):
+            row[hour] += count
+    return into
+
+
+def peak_cell(heatmap):
+    """(weekday index, hour, count) of the busiest cell, or None for an empty heatmap."""
+    count, weekday, hour = max((c, -w, -h) for w, row in enumerate(heatmap['counts']) for h, c in enumerate(row))
+    return (-weekday, -hour, count) if count else None
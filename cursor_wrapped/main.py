@@ -6,22 +6,36 @@ Fetches yearly usage stats from Cursor's API after browser login for auth
 
 import time
 import json
+import argparse
 import sys
 import os
 import tempfile
-import requests
-from datetime import datetime, timedelta
-from collections import defaultdict
+import threading
+import calendar
+import importlib.util
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import subprocess
 import urllib.parse
 
-# Try to import PIL for terminal screenshot generation
-try:
-    from PIL import Image, ImageDraw, ImageFont
-    HAS_PIL = True
-except ImportError:
-    HAS_PIL = False
+from cursor_wrapped.aggregates import ANALYSIS_VERSION, TokenAggregate, YearlyAggregate, aggregate_tokens_parallel
+from cursor_wrapped.client import CursorClient
+from cursor_wrapped.columnar import DAY_MS, DailyTable, EventTable, day_date, day_number, month_number
+from cursor_wrapped.heatmap import (
+    HOURS, activity_heatmap, add_heatmap, get_timezone, offset_changes, peak_cell, timezone_label
+)
+from cursor_wrapped.rangeindex import RangeIndex
+from cursor_wrapped.rollup import RollupCube
+from cursor_wrapped.window import DEFAULT_WINDOW, ReportWindow, window_from_args
+from cursor_wrapped.store import (
+    AnalysisCache, EventStore, FetchCheckpoint, ResponseCache, account_id, clear_cached_token, load_cached_token,
+    load_snapshot, save_cached_token, save_snapshot, snapshot_path
+)
+
+# PIL is only imported when a summary card image is actually generated;
+# checking for it here doesn't load it
+HAS_PIL = importlib.util.find_spec("PIL") is not None
 
 # ASCII Art digits for big number display (compact 3x5)
 ASCII_DIGITS = {
@@ -51,6 +65,24 @@ ASCII_DIGITS = {
     'b': ['████ ', '█   █', '████ ', '█   █', '████ '],
 }
 
+# Set to False (--no-animation) to print every slide once, top to bottom -
+# no typing frames, redraws, screen clears or key-press prompts - for
+# headless and scripted runs
+ANIMATE = True
+
+
+def pause(seconds):
+    """Sleep between animation frames; a no-op when animations are off."""
+    if ANIMATE:
+        time.sleep(seconds)
+
+
+def clear_screen():
+    """Start a new slide; without animations the slides just follow each other."""
+    if ANIMATE:
+        print("\033[2J\033[H", end="")
+
+
 def number_to_ascii(num_str, color="\033[97m"):
     """Convert a number string to ASCII art."""
     reset = "\033[0m"
@@ -90,24 +122,30 @@ def format_large_number(n, suffix=""):
 
 def stream_print(text, delay=0.005):
     """Print text with streaming effect."""
+    if not ANIMATE:
+        print(text)
+        return
     for char in text:
         sys.stdout.write(char)
         sys.stdout.flush()
-        time.sleep(delay)
+        pause(delay)
     print()
 
 def fade_in_block(lines, delay=0.025):
     """Animate a block of text fading in line by line."""
     for line in lines:
         print(line)
-        time.sleep(delay)
+        pause(delay)
 
 def typing_effect(text, delay=0.015):
     """Fast typing effect."""
+    if not ANIMATE:
+        sys.stdout.write(text)
+        return
     for char in text:
         sys.stdout.write(char)
         sys.stdout.flush()
-        time.sleep(delay)
+        pause(delay)
 
 def reveal_number(label, value, color="\033[96m", suffix=""):
     """Reveal a big ASCII number with animation."""
@@ -118,7 +156,7 @@ def reveal_number(label, value, color="\033[96m", suffix=""):
     typing_effect(f"  {dim}{label}{reset}", delay=0.015)
     print()
     print()  # Extra space between label and number
-    time.sleep(0.2)
+    pause(0.2)
     
     # Format number
     if isinstance(value, int) and value >= 1000:
@@ -132,9 +170,9 @@ def reveal_number(label, value, color="\033[96m", suffix=""):
     # Reveal effect - line by line with delay
     for line in ascii_lines:
         print(f"    {line}")
-        time.sleep(0.04)
+        pause(0.04)
     
-    time.sleep(0.15)
+    pause(0.15)
     print()
 
 def reveal_numbers_side_by_side(label1, value1, label2, value2, color1="\033[96m", color2="\033[95m"):
@@ -148,7 +186,7 @@ def reveal_numbers_side_by_side(label1, value1, label2, value2, color1="\033[96m
     # Print both labels aligned
     print(f"  {dim}{label1:<{COL_WIDTH}}{label2}{reset}")
     print()
-    time.sleep(0.3)
+    pause(0.3)
     
     # Format numbers
     fmt1 = f"{value1:,}" if isinstance(value1, int) and value1 >= 1000 else str(value1)
@@ -168,26 +206,53 @@ def reveal_numbers_side_by_side(label1, value1, label2, value2, color1="\033[96m
         # Calculate padding needed (COL_WIDTH minus the visual width)
         padding = COL_WIDTH - width1
         print(f"    {left}{' ' * padding}{right}")
-        time.sleep(0.08)
+        pause(0.08)
     
-    time.sleep(0.25)
+    pause(0.25)
     print()
 
-try:
-    from selenium import webdriver
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-    from selenium.webdriver.chrome.options import Options
-except ImportError:
-    print("Selenium not installed. Installing...")
-    import subprocess
-    subprocess.run(["pip3", "install", "selenium", "requests"], check=True)
-    from selenium import webdriver
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-    from selenium.webdriver.chrome.options import Options
+def import_selenium():
+    """Import Selenium on first use - only the browser sign-in needs it."""
+    try:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+    except ImportError:
+        print("Selenium not installed. Installing...")
+        subprocess.run(["pip3", "install", "selenium", "requests"], check=True)
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+    return webdriver, Options
+
+
+# How often to drain DevTools network events while waiting for sign-in
+SESSION_EVENT_INTERVAL = 0.2
+
+# How often to fall back to reading the cookie jar directly
+SESSION_COOKIE_CHECK_INTERVAL = 2
+
+
+def find_session_cookie(log_entries):
+    """Pull WorkosCursorSessionToken out of Set-Cookie headers in DevTools performance log entries."""
+    for entry in log_entries:
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError):
+            continue
+        if message.get('method') != 'Network.responseReceivedExtraInfo':
+            continue
+        
+        headers = message.get('params', {}).get('headers', {})
+        for name, value in headers.items():
+            if name.lower() != 'set-cookie':
+                continue
+            # Multiple cookies in one event are newline separated
+            for cookie in value.split('\n'):
+                cookie_name, _, rest = cookie.partition('=')
+                if cookie_name.strip() == 'WorkosCursorSessionToken':
+                    token = rest.split(';', 1)[0].strip()
+                    if token:
+                        return token
+    return None
 
 
 def get_auth_cookie():
@@ -205,6 +270,8 @@ def get_auth_cookie():
 ╚══════════════════════════════════════════════════════════════════════════════╝
 """)
     
+    webdriver, Options = import_selenium()
+    
     # Setup Chrome options - normal window for better login compatibility
     chrome_options = Options()
     chrome_options.add_argument("--window-size=1200,800")
@@ -216,6 +283,8 @@ def get_auth_cookie():
     # Add user data dir to persist login state
     chrome_options.add_argument("--disable-web-security")
     chrome_options.add_argument("--allow-running-insecure-content")
+    # Stream DevTools network events so we see Set-Cookie the moment it lands
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
     
     print("Opening browser...")
     
@@ -239,46 +308,36 @@ def get_auth_cookie():
         print("3. The window will close automatically once logged in")
         print("\nWaiting for login...")
         
-        # Poll for the auth cookie - check every 2 seconds
+        # Watch the DevTools network events for the session cookie being set.
+        # The event buffer is drained every SESSION_EVENT_INTERVAL seconds;
+        # the cookie jar is only checked as a slower fallback in case the
+        # cookie arrived some other way (e.g. already signed in).
         auth_cookie = None
         start_time = time.time()
-        last_url = ""
+        last_cookie_check = 0
         
         while not auth_cookie and (time.time() - start_time) < 300:  # 5 min timeout
             try:
-                current_url = driver.current_url
-                
-                # Log URL changes for debugging
-                if current_url != last_url:
-                    if 'dashboard' in current_url.lower():
-                        print("   Dashboard detected, checking for auth...")
-                    last_url = current_url
+                try:
+                    auth_cookie = find_session_cookie(driver.get_log("performance"))
+                except Exception:
+                    # Performance logging unavailable - rely on the cookie jar
+                    pass
                 
-                # Check all cookies
-                cookies = driver.get_cookies()
-                for cookie in cookies:
-                    if cookie['name'] == 'WorkosCursorSessionToken':
-                        auth_cookie = cookie['value']
-                        print("   Auth token found!")
-                        break
-                
-                # If we're on dashboard and have the cookie, we're done
-                if auth_cookie and 'dashboard' in current_url.lower():
-                    break
-                
-                # If we're on dashboard but no cookie yet, wait a bit more
-                if 'dashboard' in current_url.lower() and not auth_cookie:
-                    time.sleep(2)
-                    # Refresh cookies
-                    cookies = driver.get_cookies()
-                    for cookie in cookies:
+                if not auth_cookie and time.time() - last_cookie_check >= SESSION_COOKIE_CHECK_INTERVAL:
+                    last_cookie_check = time.time()
+                    for cookie in driver.get_cookies():
                         if cookie['name'] == 'WorkosCursorSessionToken':
                             auth_cookie = cookie['value']
                             break
                 
-                time.sleep(2)
+                if auth_cookie:
+                    print("   Auth token found!")
+                    break
+                
+                time.sleep(SESSION_EVENT_INTERVAL)
             except Exception as e:
-                time.sleep(2)
+                time.sleep(SESSION_COOKIE_CHECK_INTERVAL)
         
         if auth_cookie:
             print("\nLogin successful! Got auth token.")
@@ -293,101 +352,412 @@ def get_auth_cookie():
         driver.quit()
 
 
-def fetch_yearly_analytics(auth_cookie):
-    """Fetch full year analytics from Cursor API."""
+def get_session_token(force_login=False):
+    """Reuse the saved session token if it still works, else sign in through the browser."""
+    
+    if not force_login:
+        token = load_cached_token()
+        if token:
+            valid = CursorClient(token, max_retries=0, adaptive=False).check_session()
+            if valid:
+                print("Using saved Cursor session")
+                return token
+            if valid is None:
+                # A network problem says nothing about the token - keep it
+                print("Could not reach Cursor to check the saved session, using it anyway")
+                return token
+            print("Saved Cursor session has expired, signing in again...")
+            clear_cached_token()
+    
+    token = get_auth_cookie()
+    if token:
+        save_cached_token(token)
+    return token
+
+
+# Environment variable checked for a session token in scripted runs
+TOKEN_ENV_VAR = "CURSOR_SESSION_TOKEN"
+
+
+def read_token_input(args):
+    """Return (token, source) for a token passed by flag, stdin or environment, or (None, None)."""
+    if args.token:
+        return args.token.strip(), "--token"
+    if args.token_stdin:
+        token = sys.stdin.readline().strip()
+        return (token, "stdin") if token else (None, None)
+    token = os.environ.get(TOKEN_ENV_VAR, "").strip()
+    if token:
+        return token, f"${TOKEN_ENV_VAR}"
+    return None, None
+
+
+# Number of requests in flight at once in the concurrent fetch modes
+FETCH_WORKERS = 8
+
+# Attempts per shard before a sharded analytics fetch gives up
+ANALYTICS_SHARD_RETRIES = 3
+
+
+def plan_date_shards(start_ms, end_ms, shard_days=None):
+    """Split [start_ms, end_ms] into consecutive, non-overlapping (start, end) ranges.
+    
+    Ranges follow UTC calendar months by default, or are shard_days long.
+    """
+    shards = []
+    start = start_ms
+    while start <= end_ms:
+        if shard_days:
+            next_start = start + shard_days * 86_400_000
+        else:
+            d = datetime.utcfromtimestamp(start / 1000)
+            next_month = datetime(d.year + d.month // 12, d.month % 12 + 1, 1)
+            next_start = calendar.timegm(next_month.timetuple()) * 1000
+        shards.append((start, min(next_start - 1, end_ms)))
+        start = next_start
+    return shards
+
+
+def fetch_yearly_analytics(auth_cookie, client=None, since=None, sharded=False, shard_days=None, workers=4,
+                           on_progress=None, window=DEFAULT_WINDOW, until=None):
+    """Fetch the analytics for a reporting window from Cursor API.
     
-    print("\nFetching yearly analytics...")
+    since and until (epoch ms) narrow the request to the days in between.
+    With sharded=True the window is split into month-sized (or shard_days)
+    ranges fetched concurrently; a failed shard is retried on its own and
+    the shards' dailyMetrics are stitched back into one response.
     
-    # Hardcoded date range (Jan 2025 - Aug 2025)
-    end_ts = "1765785600000"
-    start_ts = "1735718400000"
+    on_progress(done, total) takes over progress reporting from the status
+    lines, for callers that draw their own progress display.
+    """
     
-    # API endpoint
-    url = "https://cursor.com/api/dashboard/get-user-analytics"
+    say = print if on_progress is None else (lambda *args, **kwargs: None)
     
-    # Request payload
-    payload = {
-        "teamId": 0,
-        "userId": 0,
-        "startDate": start_ts,
-        "endDate": end_ts
-    }
+    from requests.exceptions import HTTPError
     
-    # Headers
-    headers = {
-        "accept": "*/*",
-        "content-type": "application/json",
-        "origin": "https://cursor.com",
-        "referer": "https://cursor.com/dashboard",
-        "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-    }
+    say("\nFetching yearly analytics...")
     
-    # Cookies
-    cookies = {
-        "WorkosCursorSessionToken": auth_cookie
-    }
+    if client is None:
+        client = CursorClient(auth_cookie, pool_size=max(workers, 1))
+    
+    start_ts, end_ts = str(window.start_ms), str(window.end_ms)
+    if until is not None:
+        end_ts = str(min(int(end_ts), int(until)))
+    
+    if since is not None:
+        start_ts = str(max(int(start_ts), int(since)))
+        if int(start_ts) > int(end_ts):
+            say("Analytics already up to date")
+            return {'dailyMetrics': []}
+    
+    def fetch_range(range_start, range_end):
+        # Request payload
+        payload = {
+            "teamId": 0,
+            "userId": 0,
+            "startDate": str(range_start),
+            "endDate": str(range_end)
+        }
+        return client.post_json("/api/dashboard/get-user-analytics", payload)
+    
+    if sharded:
+        shards = plan_date_shards(int(start_ts), int(end_ts), shard_days)
+        results = {}
+        pending = list(range(len(shards)))
+        last_error = None
+        
+        for attempt in range(ANALYTICS_SHARD_RETRIES):
+            if attempt:
+                time.sleep(0.5 * 2 ** attempt)
+            with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+                futures = {executor.submit(fetch_range, *shards[i]): i for i in pending}
+                for future in as_completed(futures):
+                    try:
+                        results[futures[future]] = future.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    if on_progress:
+                        on_progress(len(results), len(shards))
+            # Only the shards that failed go around again
+            pending = [i for i in pending if i not in results]
+            if not pending:
+                break
+        
+        if pending:
+            print(f"Error fetching analytics: {len(pending)} of {len(shards)} shards failed ({last_error})")
+            return None
+        
+        data = dict(results[0])
+        days = {}
+        for i in range(len(shards)):
+            for day in results[i].get('dailyMetrics', []):
+                days[str(day.get('date'))] = day
+        data['dailyMetrics'] = sorted(days.values(), key=lambda d: int(d.get('date', 0)))
+        
+        say(f"Got {len(data['dailyMetrics'])} days of data ({len(shards)} shards)")
+        return data
     
     try:
-        response = requests.post(url, json=payload, headers=headers, cookies=cookies)
-        response.raise_for_status()
-        data = response.json()
+        data = fetch_range(start_ts, end_ts)
         
-        print(f"Got {len(data.get('dailyMetrics', []))} days of data")
+        if on_progress:
+            on_progress(1, 1)
+        say(f"Got {len(data.get('dailyMetrics', []))} days of data")
         return data
         
-    except requests.exceptions.HTTPError as e:
+    except HTTPError as e:
         print(f"API Error: {e}")
-        print(f"   Response: {response.text[:500]}")
+        print(f"   Response: {e.response.text[:500]}")
         return None
     except Exception as e:
         print(f"Error fetching analytics: {e}")
         return None
 
 
-def fetch_token_usage(auth_cookie):
-    """Fetch detailed token usage from Cursor API."""
-    
-    print("Fetching token usage data...")
-    
-    # Date range: Jan 1, 2025 to Dec 15, 2025
-    start_ts = "1735718400000"
-    end_ts = "1765871999999"
-    
-    url = "https://cursor.com/api/dashboard/get-filtered-usage-events"
+# Page size for get-filtered-usage-events (the API caps it at 500)
+USAGE_PAGE_SIZE = 500
+
+
+class IncompleteFetchError(Exception):
+    """A usage-event fetch lost pages; events holds the ones that did arrive (None if not kept).
     
-    headers = {
-        "accept": "*/*",
-        "content-type": "application/json",
-        "origin": "https://cursor.com",
-        "referer": "https://cursor.com/dashboard?tab=usage",
-        "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36"
-    }
+    Pages come newest first, so a partial result is usually missing older
+    events and must not be merged as if the range were complete.
+    """
     
-    cookies = {
-        "WorkosCursorSessionToken": auth_cookie
+    def __init__(self, failed_pages, events):
+        super().__init__(f"{len(failed_pages)} page(s) of usage events could not be fetched")
+        self.failed_pages = sorted(failed_pages)
+        self.events = events
+
+
+def fetch_usage_page(client, page, start_ts, end_ts):
+    """Fetch one page of get-filtered-usage-events."""
+    payload = {
+        "teamId": 0,
+        "startDate": start_ts,
+        "endDate": end_ts,
+        "page": page,
+        "pageSize": USAGE_PAGE_SIZE
     }
+    return client.post_json(
+        "/api/dashboard/get-filtered-usage-events",
+        payload,
+        referer="https://cursor.com/dashboard?tab=usage"
+    )
+
+
+class UsageRange:
+    """The usage-event range a fetch pages through, and its checkpoint.
+    
+    Shared setup of fetch_token_usage and stream_token_usage: the window
+    narrowed to since/until and cut at now (or where a resumed checkpoint
+    cut it), with page(n) serving checkpointed pages before asking the API.
+    empty is set when since is past the end of the window. Status lines go
+    through say, which is silent when the caller draws its own progress.
+    """
+    
+    def __init__(self, client, window, since=None, until=None, account=None, on_progress=None):
+        self.say = print if on_progress is None else (lambda *args, **kwargs: None)
+        self.say("Fetching token usage data...")
+        self.client = client
+        self.checkpoint = None
+        
+        start, end = window.start_ms, window.end_ms
+        if until is not None:
+            end = min(end, int(until))
+        if since is not None:
+            start = max(start, int(since))
+        self.start_ts, self.end_ts = str(start), str(end)
+        self.empty = start > end
+        if self.empty:
+            self.say("   Token usage already up to date")
+            return
+        
+        now_ms = int(time.time() * 1000)
+        if account:
+            # An open range's end date moves every day - key it by its start
+            key_end = self.end_ts if end < now_ms else 'open'
+            self.checkpoint = FetchCheckpoint(account, self.start_ts, key_end).load()
+            if self.checkpoint.pages:
+                self.say(f"   Resuming from checkpoint ({len(self.checkpoint.pages)} pages already fetched)")
+        
+        # Events can't be newer than now; cutting the range here (or where the
+        # resumed checkpoint cut it) keeps page offsets stable while new events
+        # keep arriving
+        self.end_ts = str(min(end, now_ms))
+        if self.checkpoint is not None:
+            self.end_ts = self.checkpoint.freeze(self.end_ts)
+    
+    def page(self, page):
+        """One page of the range, from the checkpoint if an earlier run got it."""
+        if self.checkpoint is not None and page in self.checkpoint.pages:
+            # Handed over once, so resumed pages don't stay in memory twice
+            return self.checkpoint.pages.pop(page)
+        data = fetch_usage_page(self.client, page, self.start_ts, self.end_ts)
+        if self.checkpoint is not None:
+            self.checkpoint.record(page, data)
+        return data
     
-    all_events = []
+    def complete(self):
+        """Forget the checkpoint once every page has been fetched."""
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
+
+
+def print_usage_progress(fetched, total_count, bar_width=30):
+    """Redraw the token usage loading bar."""
+    if not ANIMATE:
+        return
+    if total_count > 0:
+        progress = min(fetched / total_count, 1.0)
+        filled = int(bar_width * progress)
+        bar = '█' * filled + '░' * (bar_width - filled)
+        print(f"\r   [{bar}] {fetched}/{total_count} events", end='', flush=True)
+    else:
+        print(f"\r   Loading... {fetched} events", end='', flush=True)
+
+
+class FetchProgress:
+    """One combined loading line for fetches running side by side.
+    
+    Each fetch reports through its own tracker(name) callback; updates can
+    come from any thread.
+    """
+    
+    def __init__(self, *names, bar_width=12):
+        self.lock = threading.Lock()
+        self.bar_width = bar_width
+        self.state = {name: [0, 0] for name in names}
+    
+    def tracker(self, name):
+        return lambda done, total: self.update(name, done, total)
+    
+    def update(self, name, done, total):
+        with self.lock:
+            self.state[name] = [done, total or 0]
+            if ANIMATE:
+                self.render()
+    
+    def render(self):
+        parts = []
+        for name, (done, total) in self.state.items():
+            progress = min(done / total, 1.0) if total > 0 else 0
+            filled = int(self.bar_width * progress)
+            bar = '█' * filled + '░' * (self.bar_width - filled)
+            parts.append(f"{name} [{bar}] {done:,}/{total:,}" if total > 0 else f"{name} [{bar}] {done:,}")
+        print(("\r   " if ANIMATE else "   ") + "   ".join(parts), end='', flush=True)
+    
+    def close(self):
+        with self.lock:
+            if not ANIMATE:
+                # Nothing was drawn while fetching - show where it ended once
+                self.render()
+            print()
+
+
+def fetch_token_usage(auth_cookie, workers=1, client=None, since=None, on_progress=None, account=None, into=None,
+                      window=DEFAULT_WINDOW, until=None, on_complete=None):
+    """Fetch detailed token usage for a reporting window from Cursor API.
+    
+    With workers > 1, page 1 is fetched first and its totalUsageEventsCount
+    is used to plan the remaining pages, which are then fetched on a thread
+    pool of that size and merged back in page order. since and until
+    (epoch ms) narrow the request to events in that range. on_progress(done,
+    total) replaces the loading bar and status lines. Given an account id,
+    every page is checkpointed to disk and an interrupted fetch of the same
+    range resumes from the pages it already has. Events are collected into
+    a list, or into `into` (e.g. an EventTable) page by page as they arrive.
+    Once every page is in, on_complete(start_ms, end_ms) gets the range the
+    events were fetched for - cut at the time of the fetch if it was open.
+    
+    Raises IncompleteFetchError if any page could not be fetched.
+    """
+    
+    if client is None:
+        client = CursorClient(auth_cookie, pool_size=max(workers, 1))
+    
+    usage = UsageRange(client, window, since, until, account, on_progress)
+    say, fetch_page = usage.say, usage.page
+    if usage.empty:
+        return into if into is not None else []
+    
+    all_events = into if into is not None else []
+    failed_pages = []
     page = 1
     total_count = None
     
+    def finish():
+        if failed_pages:
+            # The checkpoint keeps the pages that did arrive for the next try
+            raise IncompleteFetchError(failed_pages, all_events)
+        # Clear the loading bar line and print final result
+        say(f"\r   Fetched {len(all_events)} token usage events" + " " * 20)
+        usage.complete()
+        if on_complete is not None:
+            on_complete(int(usage.start_ts), int(usage.end_ts))
+        return all_events
+    
     # Loading bar characters
     bar_width = 30
     
+    if on_progress is None:
+        on_progress = lambda done, total: print_usage_progress(done, total, bar_width)
+    
+    if workers > 1:
+        try:
+            data = fetch_page(1)
+        except Exception:
+            data = None
+        
+        if data is not None:
+            total_count = data.get('totalUsageEventsCount', 0)
+            events = data.get('usageEventsDisplay', [])
+            all_events.extend(events)
+            on_progress(len(all_events), total_count)
+            
+            if len(events) < USAGE_PAGE_SIZE:
+                return finish()
+            
+            # Plan every remaining page from the total count
+            total_pages = max(-(-total_count // USAGE_PAGE_SIZE), 1)
+            pages = {}
+            fetched = len(all_events)
+            
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(fetch_page, p): p for p in range(2, total_pages + 1)}
+                for future in as_completed(futures):
+                    try:
+                        events = future.result().get('usageEventsDisplay', [])
+                    except Exception:
+                        failed_pages.append(futures[future])
+                        continue
+                    # Parse each page into a container like all_events right away
+                    pages[futures[future]] = type(all_events)()
+                    pages[futures[future]].extend(events)
+                    fetched += len(events)
+                    on_progress(fetched, total_count)
+            
+            # Merge in page order, stopping at the first gap like the sequential walk
+            for p in range(2, total_pages + 1):
+                events = pages.get(p)
+                if not events or len(events) < USAGE_PAGE_SIZE:
+                    all_events.extend(events or [])
+                    break
+                all_events.extend(events)
+            else:
+                # Every planned page was full, so the count went stale while
+                # we were fetching - finish the walk sequentially from here
+                page = total_pages + 1
+            
+            if page == 1:
+                return finish()
+    
     # Fetch ALL pages - keep going until we get an empty page
     while True:
-        payload = {
-            "teamId": 0,
-            "startDate": start_ts,
-            "endDate": end_ts,
-            "page": page,
-            "pageSize": 500
-        }
-        
         try:
-            response = requests.post(url, json=payload, headers=headers, cookies=cookies)
-            response.raise_for_status()
-            data = response.json()
+            data = fetch_page(page)
             
             # Get total count from first page
             if total_count is None:
@@ -402,264 +772,339 @@ def fetch_token_usage(auth_cookie):
             all_events.extend(events)
             
             # Update loading bar
-            if total_count > 0:
-                progress = min(len(all_events) / total_count, 1.0)
-                filled = int(bar_width * progress)
-                bar = '█' * filled + '░' * (bar_width - filled)
-                print(f"\r   [{bar}] {len(all_events)}/{total_count} events", end='', flush=True)
-            else:
-                print(f"\r   Loading... {len(all_events)} events", end='', flush=True)
+            on_progress(len(all_events), total_count)
             
             # Only stop if we get fewer than pageSize events (last page)
-            if len(events) < 500:
+            if len(events) < USAGE_PAGE_SIZE:
                 break
             
             page += 1
             
-        except requests.exceptions.HTTPError:
-            break
         except Exception:
+            failed_pages.append(page)
             break
     
-    # Clear the loading bar line and print final result
-    print(f"\r   Fetched {len(all_events)} token usage events" + " " * 20)
-    
-    return all_events
+    return finish()
 
 
-def analyze_token_usage(events):
-    """Analyze token usage from events."""
+def sync_analytics(auth_cookie, client, store, workers=4, on_progress=None, window=DEFAULT_WINDOW):
+    """Fetch the window's analytics days missing from the local store and merge them in.
     
-    if not events:
-        return None
+    Every stretch of the window without complete stored days is fetched -
+    before, between or after what earlier runs stored.
+    """
     
-    stats = {
-        'total_input_tokens': 0,
-        'total_output_tokens': 0,
-        'total_cache_write': 0,
-        'total_cache_read': 0,
-        'total_cost_cents': 0,
-        'model_costs': defaultdict(float),
-        'model_tokens': defaultdict(lambda: {'input': 0, 'output': 0, 'cache_write': 0, 'cache_read': 0}),
-        'event_count': len(events)
-    }
+    now_ms = int(time.time() * 1000)
+    today = now_ms - now_ms % DAY_MS
     
-    for event in events:
-        token_usage = event.get('tokenUsage', {})
-        model = event.get('model', 'unknown')
-        
-        # Token values are raw tokens (not thousands)
-        input_tokens = token_usage.get('inputTokens', 0)
-        output_tokens = token_usage.get('outputTokens', 0)
-        cache_write = token_usage.get('cacheWriteTokens', 0)
-        cache_read = token_usage.get('cacheReadTokens', 0)
-        cost_cents = token_usage.get('totalCents', 0)
-        
-        stats['total_input_tokens'] += input_tokens
-        stats['total_output_tokens'] += output_tokens
-        stats['total_cache_write'] += cache_write
-        stats['total_cache_read'] += cache_read
-        stats['total_cost_cents'] += cost_cents
+    for start, end in store.missing_analytics_ranges(window.start_ms, window.end_ms):
+        if start > now_ms:
+            break
+        data = fetch_yearly_analytics(auth_cookie, client=client, since=start, until=end, sharded=True,
+                                      workers=workers, on_progress=on_progress, window=window)
+        
+        if data is None:
+            # Fall back to what we already have rather than failing the run;
+            # the range stays missing and is retried next time
+            if store.analytics:
+                print("   Using stored analytics")
+            continue
         
-        stats['model_costs'][model] += cost_cents
-        stats['model_tokens'][model]['input'] += input_tokens
-        stats['model_tokens'][model]['output'] += output_tokens
-        stats['model_tokens'][model]['cache_write'] += cache_write
-        stats['model_tokens'][model]['cache_read'] += cache_read
+        store.merge_analytics(data)
+        # Today is still running, so it stays missing and is fetched again
+        if min(end, today - 1) >= start:
+            store.mark_analytics_fetched(start, min(end, today - 1))
     
-    return stats
+    return store.analytics
 
 
-def analyze_yearly_data(data):
-    """Analyze the yearly data and compute aggregate stats."""
+def sync_token_usage(auth_cookie, client, store, workers=1, on_progress=None, window=DEFAULT_WINDOW):
+    """Fetch the window's usage events the local store doesn't cover and merge them in.
+    
+    Every stretch of the window no earlier run fetched completely is
+    fetched. The first one after the stored events starts at their
+    high-water mark, so events logged late for the last fetched moments
+    still arrive.
+    """
+    
+    now_ms = int(time.time() * 1000)
+    hwm = store.events_high_water_mark()
+    stored = len(store.events)
+    added = 0
+    
+    for start, end in store.missing_event_ranges(window.start_ms, window.end_ms):
+        if start > now_ms:
+            break
+        if hwm is not None and start > hwm >= window.start_ms:
+            # First stretch past the stored events: pick up from the newest one
+            start, hwm = hwm, None
+        try:
+            # An open range is left to the fetch to cut at now, which keeps
+            # its checkpoint stable across runs
+            events = fetch_token_usage(auth_cookie, workers=workers, client=client, since=start,
+                                       until=end if end < now_ms else None, on_progress=on_progress,
+                                       account=store.account, into=EventTable(), window=window,
+                                       on_complete=store.mark_events_fetched)
+        except IncompleteFetchError as e:
+            # The range isn't marked as fetched, so the next run retries it
+            # (resuming from its checkpoint)
+            print(f"\n   Token usage incomplete: {e} - showing stored events only, run again to retry")
+            continue
+        added += store.merge_events(events)
     
-    if not data or 'dailyMetrics' not in data:
-        return None
+    if stored and on_progress is None:
+        print(f"   {added} new events ({len(store.events)} total)")
     
-    metrics = data['dailyMetrics']
-    
-    # Aggregate stats
-    stats = {
-        'total_lines_added': 0,
-        'total_lines_deleted': 0,
-        'accepted_lines_added': 0,
-        'accepted_lines_deleted': 0,
-        'total_applies': 0,
-        'total_accepts': 0,
-        'total_rejects': 0,
-        'total_tabs_shown': 0,
-        'total_tabs_accepted': 0,
-        'total_agent_requests': 0,
-        'subscription_included_reqs': 0,
-        'active_days': 0,
-        'model_usage': defaultdict(int),
-        'extension_usage': defaultdict(int),
-        'tab_extension_usage': defaultdict(int),
-        'client_versions': defaultdict(int),
-        'monthly_stats': defaultdict(lambda: {
-            'lines_added': 0, 
-            'accepted_lines': 0,
-            'agent_requests': 0, 
-            'active_days': 0,
-            'tabs_shown': 0,
-            'tabs_accepted': 0
-        }),
-        'daily_data': [],
-        'busiest_day': None,
-        'best_coding_day': None,
-        'most_productive_day': None,
-        'streak_current': 0,
-        'streak_longest': 0,
-        'day_of_week_stats': defaultdict(lambda: {'lines': 0, 'requests': 0, 'count': 0})
-    }
+    return store.events
+
+
+def analyze_token_usage(events, processes=1, window=None, cache=None):
+    """Analyze token usage from events (an EventTable or raw API events).
     
-    # Track streaks
-    current_streak = 0
-    longest_streak = 0
-    last_active_date = None
+    With a window, only the events inside it count (looked up through the
+    table's sorted date index). With processes > 1, large event sets are
+    split into chunks that are aggregated in a process pool and merged.
+    With an AnalysisCache, the result is memoized by the events' content.
+    """
     
-    # June 1, 2025 cutoff
-    june_cutoff = datetime(2025, 6, 1)
+    if cache is not None and events:
+        return cache.memoize('tokens', lambda: analyze_token_usage(events, processes, window), events,
+                             str(processes), repr(window))
     
-    for day in metrics:
-        # Parse date (use UTC to avoid timezone offset issues)
-        date_ts = int(day.get('date', 0)) / 1000
-        date_obj = datetime.utcfromtimestamp(date_ts)
-        
-        # Skip data before June 2025
-        if date_obj < june_cutoff:
-            continue
-        
-        month_key = date_obj.strftime('%Y-%m')
-        day_of_week = date_obj.strftime('%A')
-        
-        # Check if this was an active day
-        lines_added = day.get('linesAdded', 0)
-        lines_deleted = day.get('linesDeleted', 0)
-        total_lines = lines_added + lines_deleted  # Total lines worked on
-        agent_requests = day.get('agentRequests', 0)
-        tabs_shown = day.get('totalTabsShown', 0)
-        accepted_lines_added = day.get('acceptedLinesAdded', 0)
-        accepted_lines_deleted = day.get('acceptedLinesDeleted', 0)
-        accepted_lines = accepted_lines_added + accepted_lines_deleted  # Total accepted lines
-        
-        has_activity = total_lines > 0 or agent_requests > 0 or tabs_shown > 0
+    if window is not None and events:
+        if not isinstance(events, EventTable):
+            events = EventTable.from_events(events)
+        events = events.between(window.start_ms, window.end_ms)
+    
+    if not events:
+        return None
+    
+    if processes > 1:
+        return aggregate_tokens_parallel(events, processes).to_stats()
+    
+    return TokenAggregate.from_events(events).to_stats()
+
+
+def stream_token_usage(auth_cookie, client=None, since=None, window=DEFAULT_WINDOW, on_progress=None, account=None,
+                       tz=None):
+    """Fetch and analyze token usage in one pipelined pass (the --stream mode).
+    
+    Each page is folded into the stats and the activity heatmap as soon as
+    it lands while the next page is already in flight, so the events are
+    never held in memory. on_progress and account (checkpointing) work as
+    in fetch_token_usage. Returns (token stats like analyze_token_usage,
+    heatmap like analyze_activity); raises IncompleteFetchError if a page
+    could not be fetched rather than returning stats for part of the range.
+    """
+    
+    if client is None:
+        client = CursorClient(auth_cookie)
+    
+    usage = UsageRange(client, window, since, account=account, on_progress=on_progress)
+    if usage.empty:
+        return None, None
+    
+    if on_progress is None:
+        on_progress = print_usage_progress
+    
+    stats = TokenAggregate()
+    heatmap = activity_heatmap(None, tz)
+    total_count = None
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        page = 1
+        future = executor.submit(usage.page, page)
         
-        if has_activity:
-            stats['active_days'] += 1
-            
-            # Track streaks
-            if last_active_date:
-                days_diff = (date_obj.date() - last_active_date).days
-                if days_diff == 1:
-                    current_streak += 1
-                else:
-                    current_streak = 1
-            else:
-                current_streak = 1
-            
-            longest_streak = max(longest_streak, current_streak)
-            last_active_date = date_obj.date()
-            
-            # Update monthly stats
-            stats['monthly_stats'][month_key]['lines_added'] += total_lines
-            stats['monthly_stats'][month_key]['accepted_lines'] += accepted_lines
-            stats['monthly_stats'][month_key]['agent_requests'] += agent_requests
-            stats['monthly_stats'][month_key]['active_days'] += 1
-            stats['monthly_stats'][month_key]['tabs_shown'] += tabs_shown
-            stats['monthly_stats'][month_key]['tabs_accepted'] += day.get('totalTabsAccepted', 0)
+        while future is not None:
+            try:
+                data = future.result()
+            except Exception:
+                raise IncompleteFetchError([page], None)
             
-            # Day of week stats
-            stats['day_of_week_stats'][day_of_week]['lines'] += total_lines
-            stats['day_of_week_stats'][day_of_week]['requests'] += agent_requests
-            stats['day_of_week_stats'][day_of_week]['count'] += 1
+            if total_count is None:
+                total_count = data.get('totalUsageEventsCount', 0)
             
-            # Track busiest day (most agent requests)
-            if not stats['busiest_day'] or agent_requests > stats['busiest_day']['requests']:
-                stats['busiest_day'] = {
-                    'date': date_obj.strftime('%B %d, %Y'),
-                    'requests': agent_requests,
-                    'lines': total_lines
-                }
+            events = data.get('usageEventsDisplay', [])
             
-            # Track best coding day (most total lines)
-            if not stats['best_coding_day'] or total_lines > stats['best_coding_day']['lines']:
-                stats['best_coding_day'] = {
-                    'date': date_obj.strftime('%B %d, %Y'),
-                    'lines': total_lines,
-                    'accepted': accepted_lines
-                }
+            # Put the next request on the wire before aggregating this page
+            future = None
+            if len(events) == USAGE_PAGE_SIZE:
+                page += 1
+                future = executor.submit(usage.page, page)
             
-            # Track most productive day (same as best_coding_day but with date object)
-            if not stats['most_productive_day'] or total_lines > stats['most_productive_day']['lines']:
-                stats['most_productive_day'] = {
-                    'date': date_obj,
-                    'lines': total_lines,
-                    'accepted': accepted_lines
-                }
-        
-        # Sum up metrics
-        stats['total_lines_added'] += lines_added
-        stats['total_lines_deleted'] += lines_deleted
-        stats['accepted_lines_added'] += accepted_lines_added
-        stats['accepted_lines_deleted'] += accepted_lines_deleted
-        stats['total_applies'] += day.get('totalApplies', 0)
-        stats['total_accepts'] += day.get('totalAccepts', 0)
-        stats['total_rejects'] += day.get('totalRejects', 0)
-        stats['total_tabs_shown'] += tabs_shown
-        stats['total_tabs_accepted'] += day.get('totalTabsAccepted', 0)
-        stats['total_agent_requests'] += agent_requests
-        stats['subscription_included_reqs'] += day.get('subscriptionIncludedReqs', 0)
-        
-        # Model usage
-        for model in day.get('modelUsage', []):
-            name = model.get('name', 'unknown')
-            count = model.get('count', 0)
-            stats['model_usage'][name] += count
-        
-        # Extension usage
-        for ext in day.get('extensionUsage', []):
-            name = ext.get('name')
-            if name:  # Only count if has a name
-                count = ext.get('count', 0)
-                stats['extension_usage'][name] += count
-        
-        # Tab extension usage
-        for ext in day.get('tabExtensionUsage', []):
-            name = ext.get('name')
-            if name:
-                count = ext.get('count', 0)
-                stats['tab_extension_usage'][name] += count
-        
-        # Client version usage
-        for ver in day.get('clientVersionUsage', []):
-            name = ver.get('name', 'unknown')
-            count = ver.get('count', 0)
-            stats['client_versions'][name] += count
-        
-        # Store daily data
-        if has_activity:
-            stats['daily_data'].append({
-                'date': day.get('date'),
-                'date_str': date_obj.strftime('%Y-%m-%d'),
-                'lines_added': lines_added,
-                'accepted_lines': accepted_lines,
-                'agent_requests': agent_requests
-            })
-    
-    stats['streak_longest'] = longest_streak
-    stats['streak_current'] = current_streak
-    
-    return stats
-
-
-def print_wrapped_stats(stats, raw_data, token_stats=None):
-    """Print stats in Claude Code-inspired animated format."""
+            table = EventTable.from_events(events)
+            stats.merge(TokenAggregate.from_table(table))
+            add_heatmap(heatmap, activity_heatmap(table, tz))
+            on_progress(stats.event_count, total_count)
+    
+    usage.complete()
+    usage.say(f"\r   Analyzed {stats.event_count} token usage events" + " " * 20)
+    
+    if not stats.event_count:
+        return None, None
+    return stats.to_stats(), heatmap
+
+
+def daily_table(data, window=DEFAULT_WINDOW):
+    """The days of an analytics payload inside the window, as a DailyTable.
+    
+    The table is sorted by date, so cutting it to the window is two binary
+    searches and a slice however much history the payload holds.
+    """
+    return DailyTable.from_metrics(data.get('dailyMetrics') or []).between(window.start, window.end)
+    
+    
+def month_shards(data, window=DEFAULT_WINDOW):
+    """The raw dailyMetrics days inside the window, as one list per month, oldest first."""
+    first, last = day_number(window.start), day_number(window.end)
+    months = {}
+    for day in data.get('dailyMetrics') or []:
+        n = int(day.get('date', 0)) // DAY_MS
+        if first <= n <= last:
+            months.setdefault(month_number(day_date(n)), []).append(day)
+    return [months[month] for month in sorted(months)]
+
+
+def analyze_yearly_data(data, window=DEFAULT_WINDOW, cache=None):
+    """Analyze the yearly data and compute aggregate stats.
+    
+    The dailyMetrics payload is turned into a DailyTable once, and every
+    stat is a reduction over its columns (see YearlyAggregate). With an
+    AnalysisCache, each month is aggregated on its own and memoized by its
+    days' content, then the months are merged - so a run only redoes the
+    months whose days changed (normally just the current one, with today
+    still filling in) on top of the stored ones.
+    """
+    
+    if not data or 'dailyMetrics' not in data:
+        return None
+    
+    if cache is not None:
+        total = YearlyAggregate()
+        for days in month_shards(data, window):
+            total.merge(cache.memoize('yearly-month', lambda: YearlyAggregate.from_table(DailyTable.from_metrics(days)),
+                                      days))
+        return total.to_stats()
+    
+    return YearlyAggregate.from_table(daily_table(data, window)).to_stats()
+
+
+def analyze_activity(events, window=None, tz=None, cache=None):
+    """Weekday x hour-of-day heatmap of the usage events, bucketed in timezone tz (None for local time)."""
+    
+    if not events:
+        return None
+    
+    if not isinstance(events, EventTable):
+        events = EventTable.from_events(events)
+    
+    if cache is not None:
+        # The zone's label alone would mix up zones sharing an abbreviation,
+        # so the key also has the offsets in effect over the window
+        start, end = (window.start_ms, window.end_ms) if window else (min(events.timestamp), max(events.timestamp))
+        return cache.memoize('heatmap', lambda: analyze_activity(events, window, tz), events, repr(window),
+                             timezone_label(tz), offset_changes(tz, start, end))
+    
+    if window is not None:
+        events = events.between(window.start_ms, window.end_ms)
+    return activity_heatmap(events, tz)
+
+
+def build_rollup(data, events=None, window=DEFAULT_WINDOW, cache=None):
+    """Precompute the rollup cube the slides and exports read period breakdowns from."""
+    if cache is not None:
+        return cache.memoize('rollup', lambda: build_rollup(data, events, window), data or {},
+                             events if events else [], repr(window))
+    if events:
+        if not isinstance(events, EventTable):
+            events = EventTable.from_events(events)
+        events = events.between(window.start_ms, window.end_ms)
+    return RollupCube.build(daily_table(data or {}, window), events if events else None)
+
+
+def wrapped_metrics(stats, rollup, window=DEFAULT_WINDOW):
+    """The rates, rankings and breakdowns the slides show, derived from the stats and rollup.
+    
+    Kept in the returned wrapped data, so a replay reuses them instead of
+    deriving them again.
+    """
+    
+    # Calculate derived metrics
+    acceptance_rate = 0
+    if stats.total_applies > 0:
+        acceptance_rate = stats.total_accepts / stats.total_applies * 100
+    
+    tab_acceptance_rate = 0
+    if stats.total_tabs_shown > 0:
+        tab_acceptance_rate = stats.total_tabs_accepted / stats.total_tabs_shown * 100
+    
+    # Lines and active days per weekday (0 = Mon)
+    weekday_lines = dict(rollup.query('lines', 'weekday'))
+    weekday_days = dict(rollup.query('active_days', 'weekday'))
+    
+    best_day = None
+    best_lines = 0
+    for i, day in enumerate(['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']):
+        if weekday_days.get(i) and weekday_lines[i] > best_lines:
+            best_lines = weekday_lines[i]
+            best_day = day
+    
+    # Months with activity, as (label, {field: sum})
+    chrono_months = [
+        (RollupCube.period_label('month', start), {
+            'lines_added': row['lines'],
+            'accepted_lines': row['accepted_lines'],
+            'agent_requests': row['agent_requests'],
+            'active_days': row['active_days'],
+            'tabs_shown': row['tabs_shown'],
+            'tabs_accepted': row['tabs_accepted']
+        })
+        for start, row in rollup.rows('month', ['lines', 'accepted_lines', 'agent_requests', 'active_days',
+                                                'tabs_shown', 'tabs_accepted'])
+        if row['active_days']
+    ]
+    sorted_months = sorted(
+        [(k, v) for k, v in chrono_months if v['lines_added'] > 0],
+        key=lambda x: x[1]['lines_added'],
+        reverse=True
+    )
+    
+    return {
+        'acceptance_rate': acceptance_rate,
+        'tab_acceptance_rate': tab_acceptance_rate,
+        'net_lines': stats.accepted_lines_added - stats.accepted_lines_deleted,
+        # Days in the reporting window (199 for the default June 1 - Dec 16)
+        'total_days': window.days,
+        'weekday_lines': weekday_lines,
+        'weekday_days': weekday_days,
+        'best_day': best_day,
+        'total_model_requests': sum(stats.model_usage.values()),
+        'sorted_models': sorted(stats.model_usage.items(), key=lambda x: -x[1]),
+        'chrono_months': chrono_months,
+        'sorted_months': sorted_months,
+        'range_index': RangeIndex.from_rollup(rollup),
+    }
+
+
+def print_wrapped_stats(stats, raw_data, token_stats=None, rollup=None, window=DEFAULT_WINDOW, metrics=None,
+                        heatmap=None):
+    """Print stats in Claude Code-inspired animated format.
+    
+    The day-of-week and monthly breakdowns come from the rollup cube
+    (built from raw_data when not given). metrics, from an earlier call's
+    wrapped data, skips deriving them again on a replay. heatmap (from
+    analyze_activity) adds the hour-of-day slide.
+    """
     
     if not stats:
         print("No stats to display")
         return
     
+    if metrics is None:
+        if rollup is None:
+            rollup = build_rollup(raw_data, window=window)
+        metrics = wrapped_metrics(stats, rollup, window)
+    
     # ANSI colors
     CYAN = "\033[96m"
     MAGENTA = "\033[95m"
@@ -672,44 +1117,25 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
     BOLD = "\033[1m"
     DIM = "\033[2m"
     
-    # Calculate derived metrics
-    acceptance_rate = 0
-    if stats['total_applies'] > 0:
-        acceptance_rate = stats['total_accepts'] / stats['total_applies'] * 100
-    
-    tab_acceptance_rate = 0
-    if stats['total_tabs_shown'] > 0:
-        tab_acceptance_rate = stats['total_tabs_accepted'] / stats['total_tabs_shown'] * 100
-    
-    net_lines = stats['accepted_lines_added'] - stats['accepted_lines_deleted']
-    
-    # Calculate days (Aug 1 - Dec 16 2025 = ~138 days)
-    total_days_in_period = 199  # June 1 - Dec 16
+    acceptance_rate = metrics['acceptance_rate']
+    tab_acceptance_rate = metrics['tab_acceptance_rate']
+    net_lines = metrics['net_lines']
+    total_days_in_period = metrics['total_days']
+    weekday_lines = metrics['weekday_lines']
+    weekday_days = metrics['weekday_days']
+    best_day = metrics['best_day']
+    total_model_requests = metrics['total_model_requests']
+    sorted_models = metrics['sorted_models']
+    chrono_months = metrics['chrono_months']
+    sorted_months = metrics['sorted_months']
     
     # Pre-calculate
     day_full = {'Mon': 'Monday', 'Tue': 'Tuesday', 'Wed': 'Wednesday',
                 'Thu': 'Thursday', 'Fri': 'Friday', 'Sat': 'Saturday', 'Sun': 'Sunday'}
     day_order = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
     
-    best_day = None
-    best_lines = 0
-    for day in day_order:
-        full = day_full[day]
-        if full in stats['day_of_week_stats']:
-            if stats['day_of_week_stats'][full]['lines'] > best_lines:
-                best_lines = stats['day_of_week_stats'][full]['lines']
-                best_day = day
-    
-    total_model_requests = sum(stats['model_usage'].values())
-    sorted_models = sorted(stats['model_usage'].items(), key=lambda x: -x[1])
-    sorted_months = sorted(
-        [(k, v) for k, v in stats['monthly_stats'].items() if v['lines_added'] > 0],
-        key=lambda x: x[1]['lines_added'],
-        reverse=True
-    ) if stats['monthly_stats'] else []
-    
     # Clear screen
-    print("\033[2J\033[H", end="")
+    clear_screen()
     
     # ═══════════════════════════════════════════════════════════════════════════
     # INTRO ANIMATION - Big ASCII "CURSOR WRAPPED"
@@ -734,51 +1160,48 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
         "  ╚══╝╚══╝ ╚═╝  ╚═╝╚═╝  ╚═╝╚═╝     ╚═╝     ╚══════╝╚═════╝ ",
     ]
     
-    # Loading bar first
-    print("\n\n\n")
-    print(f"  {DIM}Loading your year in review...{RESET}")
-    print()
-    
-    bar_width = 40
-    for i in range(bar_width + 1):
-        progress = int((i / bar_width) * 100)
-        filled = "█" * i
-        empty = "░" * (bar_width - i)
-        sys.stdout.write(f"\r  {CYAN}{filled}{DIM}{empty}{RESET} {WHITE}{progress}%{RESET}")
-        sys.stdout.flush()
-        time.sleep(0.02)
-    
-    time.sleep(0.25)
-    print("\033[2J\033[H", end="")
+    # Loading bar first (cleared again before the intro, so only when animating)
+    if ANIMATE:
+        print("\n\n\n")
+        print(f"  {DIM}Loading your year in review...{RESET}")
+        print()
+        
+        bar_width = 40
+        for i in range(bar_width + 1):
+            progress = int((i / bar_width) * 100)
+            filled = "█" * i
+            empty = "░" * (bar_width - i)
+            sys.stdout.write(f"\r  {CYAN}{filled}{DIM}{empty}{RESET} {WHITE}{progress}%{RESET}")
+            sys.stdout.flush()
+            pause(0.02)
+        
+        pause(0.25)
+        clear_screen()
     
     # Reveal CURSOR line by line
     print("\n\n")
     for line in cursor_art:
         print(f"  {CYAN}{line}{RESET}")
-        time.sleep(0.04)
+        pause(0.04)
     
-    time.sleep(0.15)
+    pause(0.15)
     
     # Reveal WRAPPED line by line
     for line in wrapped_art:
         print(f"  {MAGENTA}{line}{RESET}")
-        time.sleep(0.04)
+        pause(0.04)
     
     print()
     
     # Subtitle with typing effect
     subtitle = "Your 2025 Year in AI-Assisted Coding"
-    print(f"  {DIM}", end="")
-    for char in subtitle:
-        sys.stdout.write(char)
-        sys.stdout.flush()
-        time.sleep(0.015)
+    typing_effect(f"  {DIM}{subtitle}", delay=0.015)
     print(f"{RESET}")
     
     print(f"\n  {DIM}─────────────────────────────────────────────────────────{RESET}")
-    print(f"  {DIM}June - December 2025{RESET}")
+    print(f"  {DIM}{'June - December 2025' if window == DEFAULT_WINDOW else window.label()}{RESET}")
     
-    time.sleep(0.6)
+    pause(0.6)
     
     # ═══════════════════════════════════════════════════════════════════════════
     # BIG NUMBER REVEALS
@@ -790,6 +1213,9 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
     # Helper function to wait for user to press Tab
     def wait_for_tab():
         print()
+        # No key press can arrive when stdin is a pipe (e.g. --token-stdin)
+        if not ANIMATE or not sys.stdin.isatty():
+            return
         # Fixed width box - 34 chars inner width
         box_w = 34
         text = "⇥  Press Tab to continue"
@@ -819,7 +1245,10 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
                 termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
         except (ImportError, termios.error):
             # Fallback to regular input on Windows or if termios fails
-            input()
+            try:
+                input()
+            except (KeyboardInterrupt, EOFError):
+                pass
         except (KeyboardInterrupt, EOFError):
             pass
         
@@ -829,7 +1258,7 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
     
     # Helper function for styled joke/insight comments
     def show_insight_comment(text, color=YELLOW):
-        time.sleep(0.15)
+        pause(0.15)
         print()
         # Fixed width box - 60 chars inner width
         box_inner = 60
@@ -842,7 +1271,7 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
             sys.stdout.write(f"{WHITE}{char}{RESET}")
             sys.stdout.flush()
             displayed_chars += 1
-            time.sleep(0.015)
+            pause(0.015)
         # Pad remaining space and close with right border
         # Account for emojis taking 2 visual chars
         emoji_chars = sum(1 for c in text if ord(c) > 127)
@@ -851,46 +1280,47 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
         sys.stdout.write(f"{' ' * max(0, remaining)}{color}│{RESET}\n")
         print(f"    {color}│{' ' * box_inner}│{RESET}")
         print(f"    {color}╰{'─' * box_inner}╯{RESET}")
-        time.sleep(0.25)
+        pause(0.25)
     
     # ═══════════════════════════════════════════════════════════════════════════
     # MOST PRODUCTIVE DAY - Special streaming reveal
     # ═══════════════════════════════════════════════════════════════════════════
-    if stats.get('most_productive_day'):
-        d = stats['most_productive_day']['date']
-        day_lines = stats['most_productive_day']['lines']
+    if stats.best_day:
+        d = stats.best_day.date
+        day_lines = stats.best_day.lines
         date_str = d.strftime('%B %d, %Y')
         
-        # Stream "What happened on..."
-        time.sleep(0.25)
-        question = f"What happened on {date_str}..."
-        print()  # Start on a fresh line
-        sys.stdout.write(f"  {YELLOW}")
-        sys.stdout.flush()
-        for char in question:
-            sys.stdout.write(char)
+        # Stream "What happened on..." (erased again before the reveal)
+        if ANIMATE:
+            pause(0.25)
+            question = f"What happened on {date_str}..."
+            print()  # Start on a fresh line
+            sys.stdout.write(f"  {YELLOW}")
+            sys.stdout.flush()
+            for char in question:
+                sys.stdout.write(char)
+                sys.stdout.flush()
+                pause(0.025)
+            print(RESET)
+            pause(0.75)
+            
+            # Clear the question lines
+            sys.stdout.write("\033[2A")  # Move up 2 lines
+            sys.stdout.write("\033[J")   # Clear from cursor to end of screen
             sys.stdout.flush()
-            time.sleep(0.025)
-        print(RESET)
-        time.sleep(0.75)
-        
-        # Clear the question lines
-        sys.stdout.write("\033[2A")  # Move up 2 lines
-        sys.stdout.write("\033[J")   # Clear from cursor to end of screen
-        sys.stdout.flush()
         
         # Big reveal with ASCII number
         typing_effect(f"  {YELLOW}{BOLD}🏆 YOUR TOP DAY{RESET}", delay=0.02)
         print()
-        time.sleep(0.15)
+        pause(0.15)
         
         lines_ascii = number_to_ascii(f"{day_lines:,}", YELLOW)
         for line in lines_ascii:
             print(f"    {line}")
-            time.sleep(0.04)
+            pause(0.04)
         
         print(f"    {DIM}lines of code on {RESET}{WHITE}{date_str}{RESET}")
-        time.sleep(0.15)
+        pause(0.15)
         
         # Celebratory message
         print()
@@ -899,9 +1329,9 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
         for char in celeb_msg:
             sys.stdout.write(char)
             sys.stdout.flush()
-            time.sleep(0.015)
+            pause(0.015)
         print(RESET)
-        time.sleep(0.5)
+        pause(0.5)
         
         print(f"\n  {DIM}{'─' * 60}{RESET}\n")
     
@@ -909,10 +1339,10 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
     # POWER DAY (most productive day of week)
     # ═══════════════════════════════════════════════════════════════════════════
     if best_day:
-        time.sleep(0.25)
+        pause(0.25)
         typing_effect(f"  {MAGENTA}{BOLD}📅 YOUR FAVORITE CODING DAY{RESET}", delay=0.02)
         print()
-        time.sleep(0.2)
+        pause(0.2)
         
         # ASCII art for day names
         day_ascii = {
@@ -978,26 +1408,26 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
         if day_name in day_ascii:
             for line in day_ascii[day_name]:
                 print(f"    {MAGENTA}{line}{RESET}")
-                time.sleep(0.04)
+                pause(0.04)
         else:
             # Fallback for any missing day
             print(f"    {MAGENTA}{BOLD}{day_name.upper()}{RESET}")
         
         print()
         print(f"    {DIM}your most productive day{RESET}")
-        time.sleep(0.4)
+        pause(0.4)
         
         print(f"\n  {DIM}{'─' * 60}{RESET}\n")
     
     # Lines of Code + Agent Requests - SIDE BY SIDE
-    time.sleep(0.5)
-    total_accepted = stats['accepted_lines_added'] + stats['accepted_lines_deleted']
+    pause(0.5)
+    total_accepted = stats.accepted_lines_added + stats.accepted_lines_deleted
     reveal_numbers_side_by_side(
         "Lines of AI Code Accepted", total_accepted,
-        "Agent Requests Made", stats['total_agent_requests'],
+        "Agent Requests Made", stats.total_agent_requests,
         CYAN, MAGENTA
     )
-    time.sleep(0.6)
+    pause(0.6)
     
     # Active Days + Longest Streak - SIDE BY SIDE
     COL_WIDTH = 32
@@ -1005,11 +1435,11 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
     # Print both labels aligned
     print(f"  {DIM}{'Active Coding Days':<{COL_WIDTH}}Longest Streak{RESET}")
     print()
-    time.sleep(0.3)
+    pause(0.3)
     
     # Build ASCII for both
-    active_str = f"{stats['active_days']}"
-    streak_str = f"{stats['streak_longest']}"
+    active_str = f"{stats.active_days}"
+    streak_str = f"{stats.streak_longest}"
     active_lines = number_to_ascii(active_str, GREEN)
     streak_lines = number_to_ascii(streak_str, YELLOW)
     
@@ -1022,16 +1452,16 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
         right = streak_lines[i] if i < len(streak_lines) else ""
         padding = COL_WIDTH - width1
         print(f"    {left}{' ' * padding}{right}")
-        time.sleep(0.08)
+        pause(0.08)
     
     # Subtitles aligned
     sub1 = f"out of {total_days_in_period} days"
     print(f"    {DIM}{sub1:<{COL_WIDTH}}days in a row{RESET}")
-    time.sleep(0.3)
+    pause(0.3)
     print()
     
     # Calculate activity percentage and add joke
-    activity_pct = (stats['active_days'] / total_days_in_period) * 100 if total_days_in_period > 0 else 0
+    activity_pct = (stats.active_days / total_days_in_period) * 100 if total_days_in_period > 0 else 0
     if activity_pct >= 90:
         top_pct = 100 - activity_pct
         show_insight_comment(f"You're top {top_pct:.0f}% of users! You've been feeling the AGI 🔥", GREEN)
@@ -1040,7 +1470,7 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
     else:
         show_insight_comment("Taking it easy? The code won't write itself... oh wait 🤖", YELLOW)
     
-    time.sleep(0.4)
+    pause(0.4)
     
     # AI Trust Level - acceptance rate with interpretation and jokes
     trust_pct = int(acceptance_rate)
@@ -1057,24 +1487,24 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
         trust_color = YELLOW
         trust_joke = "Why don't you trust the AGI? It just wants to help... 🤖"
     
-    time.sleep(0.25)
+    pause(0.25)
     typing_effect(f"  {DIM}AI Trust Level{RESET}", delay=0.015)
     print()
-    time.sleep(0.15)
+    pause(0.15)
     
     # Show percentage as ASCII
     pct_str = f"{trust_pct}"
     ascii_pct = number_to_ascii(pct_str, trust_color)
     for line in ascii_pct:
         print(f"    {line} {trust_color}%{RESET}")
-        time.sleep(0.03)
+        pause(0.03)
     
-    time.sleep(0.2)
+    pause(0.2)
     print(f"    {trust_color}{BOLD}{trust_label}{RESET} {DIM}— You accepted {trust_pct}% of AI suggestions{RESET}")
     
     show_insight_comment(trust_joke, trust_color)
     
-    time.sleep(0.25)
+    pause(0.25)
     
     print(f"\n  {DIM}{'─' * 60}{RESET}")
     
@@ -1084,33 +1514,31 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
     # DETAILED STATS
     # ═══════════════════════════════════════════════════════════════════════════
     
-    print("\033[2J\033[H", end="")
+    clear_screen()
     print(f"\n  {CYAN}{BOLD}DETAILED BREAKDOWN{RESET}")
     print(f"  {DIM}{'─' * 60}{RESET}\n")
     
-    time.sleep(0.25)
+    pause(0.25)
     print()
     stream_print(f"  {CYAN}{BOLD}▸ ACTIVITY BY DAY OF WEEK{RESET}", delay=0.015)
     print()
-    time.sleep(0.25)
+    pause(0.25)
     
-    max_day_lines = max((stats['day_of_week_stats'].get(day_full[d], {}).get('lines', 0) 
-                        for d in day_order), default=1)
+    max_day_lines = max((weekday_lines[i] for i in range(7) if weekday_days[i]), default=1)
     
-    for day in day_order:
-        full = day_full[day]
-        if full in stats['day_of_week_stats']:
-            lines = stats['day_of_week_stats'][full]['lines']
+    for i, day in enumerate(day_order):
+        if weekday_days[i]:
+            lines = weekday_lines[i]
             bar_len = int((lines / max_day_lines) * 25) if max_day_lines > 0 else 0
             bar = f"{CYAN}{'█' * bar_len}{DIM}{'░' * (25 - bar_len)}{RESET}"
             star = f"  {YELLOW}★ BEST{RESET}" if day == best_day else ""
             print(f"    {WHITE}{day}{RESET}  {bar}  {WHITE}{lines:>7,}{RESET} lines{star}")
-            time.sleep(0.08)
+            pause(0.08)
     
-    time.sleep(0.4)
+    pause(0.4)
     
     # Models - Big animated section
-    time.sleep(0.3)
+    pause(0.3)
     print()
     
     # Animated header reveal
@@ -1119,10 +1547,10 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
     for char in model_header:
         sys.stdout.write(f"{BOLD}{char}{RESET}{MAGENTA}")
         sys.stdout.flush()
-        time.sleep(0.025)
+        pause(0.025)
     print(RESET)
     print()
-    time.sleep(0.25)
+    pause(0.25)
     
     # Favorite model gets big treatment
     if sorted_models:
@@ -1130,22 +1558,24 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
         fav_pct = fav_count / total_model_requests * 100 if total_model_requests > 0 else 0
         
         # Pulsing reveal for #1 model
-        pulses = ["◐", "◓", "◑", "◒"]
-        for i in range(4):
-            sys.stdout.write(f"\r    {MAGENTA}{pulses[i % 4]}{RESET} Calculating your favorite...")
-            sys.stdout.flush()
-            time.sleep(0.05)
+        if ANIMATE:
+            pulses = ["◐", "◓", "◑", "◒"]
+            for i in range(4):
+                sys.stdout.write(f"\r    {MAGENTA}{pulses[i % 4]}{RESET} Calculating your favorite...")
+                sys.stdout.flush()
+                pause(0.05)
+            sys.stdout.write("\r")
         
-        print(f"\r    {MAGENTA}{BOLD}★ #1 FAVORITE MODEL{RESET}                          ")
+        print(f"    {MAGENTA}{BOLD}★ #1 FAVORITE MODEL{RESET}                          ")
         print()
-        time.sleep(0.1)
+        pause(0.1)
         
         # Big model name reveal - show full name
         print(f"    {WHITE}{BOLD}", end="")
         for char in fav_model:
             sys.stdout.write(char)
             sys.stdout.flush()
-            time.sleep(0.015)
+            pause(0.015)
         print(RESET)
         
         # Stats bar
@@ -1154,10 +1584,10 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
         print(f"    {MAGENTA}{'█' * bar_filled}{DIM}{'░' * (bar_width - bar_filled)}{RESET}")
         print(f"    {WHITE}{fav_count:,}{RESET} uses  •  {WHITE}{fav_pct:.1f}%{RESET} of all requests")
         print()
-        time.sleep(0.3)
+        pause(0.3)
         
         # Special reveal: "You and X model wrote X lines of code together"
-        lines_written = stats['accepted_lines_added'] + stats['accepted_lines_deleted']
+        lines_written = stats.accepted_lines_added + stats.accepted_lines_deleted
         
         print(f"    ", end="")
         msg_parts = [
@@ -1171,9 +1601,9 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
             for char in text:
                 sys.stdout.write(f"{color}{char}{RESET}")
                 sys.stdout.flush()
-                time.sleep(0.018)
+                pause(0.018)
         print()
-        time.sleep(0.4)
+        pause(0.4)
         
         # Apollo 11 comparison if > 145,000 lines
         APOLLO_11_LINES = 145000
@@ -1185,9 +1615,9 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
             color = YELLOW if char.isdigit() or char == '.' or char == 'x' else DIM
             sys.stdout.write(f"{color}{char}{RESET}")
             sys.stdout.flush()
-            time.sleep(0.012)
+            pause(0.012)
         print()
-        time.sleep(0.3)
+        pause(0.3)
         
         print()
         
@@ -1203,17 +1633,17 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
                 
                 # Simple reveal without color bleed
                 print(f"    {DIM}#{i}{RESET}  {WHITE}{model_display:22}{RESET} {MAGENTA}{'▓' * bar_len}{RESET}{DIM}{'░' * bar_empty}{RESET}  {WHITE}{count:>5,}{RESET} uses {DIM}({pct:.1f}%){RESET}")
-                time.sleep(0.05)
+                pause(0.05)
     
     # Monthly breakdown as bar graph
     if sorted_months:
         wait_for_tab()
         
-        print("\033[2J\033[H", end="")
+        clear_screen()
         print(f"\n  {GREEN}{BOLD}MONTHLY BREAKDOWN{RESET}")
         print(f"  {DIM}Accepted lines of AI-generated code by month{RESET}")
         print(f"  {DIM}{'─' * 60}{RESET}\n")
-        time.sleep(0.3)
+        pause(0.3)
         
         month_short = {
             '01': 'Jan', '02': 'Feb', '03': 'Mar', '04': 'Apr',
@@ -1225,9 +1655,6 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
         max_lines = max(data['lines_added'] for _, data in sorted_months) if sorted_months else 1
         bar_max_width = 35
         
-        # Sort by month chronologically for the graph
-        chrono_months = sorted(stats['monthly_stats'].items(), key=lambda x: x[0])
-        
         # Show bar graph for each month
         for month, data in chrono_months:
             year, month_num = month.split('-')
@@ -1256,37 +1683,37 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
             # Print the bar
             bar = f"{bar_color}{'█' * bar_width}{RESET}{DIM}{'░' * bar_empty}{RESET}"
             print(f"    {WHITE}{m_name}{RESET}  {bar}  {WHITE}{lines:>6,}{RESET}{star}")
-            time.sleep(0.1)
+            pause(0.1)
         
         print()
         print(f"    {DIM}★ = top month{RESET}")
-        time.sleep(0.3)
+        pause(0.3)
     
     # Tab completions - bigger section
-    time.sleep(0.4)
+    pause(0.4)
     print()
     stream_print(f"  {BLUE}{BOLD}▸ TAB COMPLETIONS{RESET}", delay=0.015)
     print()
-    time.sleep(0.25)
+    pause(0.25)
     
     # Big number for tabs accepted
     typing_effect(f"    {DIM}Tabs Accepted{RESET}", delay=0.015)
     print()
-    tab_ascii = number_to_ascii(f"{stats['total_tabs_accepted']:,}", BLUE)
+    tab_ascii = number_to_ascii(f"{stats.total_tabs_accepted:,}", BLUE)
     for line in tab_ascii:
         print(f"      {line}")
-        time.sleep(0.015)
-    print(f"      {DIM}out of {stats['total_tabs_shown']:,} suggestions ({tab_acceptance_rate:.1f}% acceptance rate){RESET}")
+        pause(0.015)
+    print(f"      {DIM}out of {stats.total_tabs_shown:,} suggestions ({tab_acceptance_rate:.1f}% acceptance rate){RESET}")
     print()
     
     # Token usage section (if available)
     if token_stats and token_stats.get('event_count', 0) > 0:
         wait_for_tab()
         
-        print("\033[2J\033[H", end="")
+        clear_screen()
         print(f"\n  {GREEN}{BOLD}TOKEN USAGE{RESET}")
         print(f"  {DIM}{'─' * 60}{RESET}\n")
-        time.sleep(0.25)
+        pause(0.25)
         
         # Total tokens includes input + output + cache (matches Cursor dashboard)
         total_tokens = (token_stats['total_input_tokens'] + token_stats['total_output_tokens'] + 
@@ -1303,7 +1730,7 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
         token_ascii = number_to_ascii(token_display, GREEN)
         for line in token_ascii:
             print(f"    {line}")
-            time.sleep(0.015)
+            pause(0.015)
         print(f"    {DIM}({total_tokens:,} tokens){RESET}")
         print()
         
@@ -1316,15 +1743,65 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
         print()
         print(f"    {DIM}Estimated cost:{RESET}    {GREEN}{BOLD}${cost_dollars:>10,.2f}{RESET}")
         
-        # Cost by model
+        # Per-request distribution (percentiles from the streaming sketches)
+        quantiles = token_stats.get('quantiles')
+        if quantiles and quantiles['input']['p50'] is not None:
+            print()
+            print(f"    {DIM}Per request:{RESET}      {DIM}{'p50':>9} {'p90':>9} {'p99':>9}{RESET}")
+            for label, name in [("Input tokens", 'input'), ("Output tokens", 'output')]:
+                row = " ".join(f"{format_large_number(round(quantiles[name][p])):>9}" for p in ('p50', 'p90', 'p99'))
+                print(f"      {DIM}{label + ':':16}{RESET}{WHITE}{row}{RESET}")
+            row = " ".join(f"{'$' + format(quantiles['cents'][p] / 100, ',.2f'):>9}" for p in ('p50', 'p90', 'p99'))
+            print(f"      {DIM}{'Cost:':16}{RESET}{WHITE}{row}{RESET}")
+        
+        # Cost by model, with each model's median request
         if token_stats.get('model_costs'):
             print()
-            print(f"    {DIM}Cost by model:{RESET}")
+            print(f"    {DIM}Cost by model:{RESET}                            {DIM}median request{RESET}")
             sorted_costs = sorted(token_stats['model_costs'].items(), key=lambda x: -x[1])[:4]
+            model_quantiles = token_stats.get('model_quantiles', {})
             for model, cost in sorted_costs:
                 model_short = model[:25] if len(model) <= 25 else model[:22] + "..."
                 cost_usd = cost / 100
-                print(f"      {WHITE}{model_short:27}{RESET} ${cost_usd:>8,.2f}")
+                median = ""
+                if model in model_quantiles:
+                    mq = model_quantiles[model]
+                    median = (f"{format_large_number(round(mq['input']['p50']))} in / "
+                              f"{format_large_number(round(mq['output']['p50']))} out")
+                print(f"      {WHITE}{model_short:27}{RESET} ${cost_usd:>8,.2f}   {DIM}{median}{RESET}")
+        print()
+    
+    # ═══════════════════════════════════════════════════════════════════════════
+    # WHEN YOU CODE - weekday x hour-of-day heatmap of usage events
+    # ═══════════════════════════════════════════════════════════════════════════
+    peak = peak_cell(heatmap) if heatmap else None
+    if peak:
+        wait_for_tab()
+        
+        clear_screen()
+        print(f"\n  {MAGENTA}{BOLD}WHEN YOU CODE{RESET}")
+        print(f"  {DIM}{'─' * 60}{RESET}\n")
+        print(f"  {DIM}Requests by hour of day ({heatmap['timezone']}){RESET}")
+        print()
+        pause(0.25)
+        
+        shades = "·░▒▓█"
+        peak_count = peak[2]
+        print(f"        {DIM}{''.join(f'{hour:<6}' for hour in range(0, HOURS, 3))}{RESET}")
+        for i, day in enumerate(day_order):
+            cells = "".join(
+                shades[0 if not count else 1 + min(3, (4 * count - 1) // peak_count)] * 2
+                for count in heatmap['counts'][i]
+            )
+            print(f"  {WHITE}{day}{RESET}   {MAGENTA}{cells}{RESET}")
+            pause(0.06)
+        print()
+        print(f"        {DIM}· none  ░ low  ▒  ▓  █ peak{RESET}")
+        print()
+        
+        weekday, hour, count = peak
+        print(f"  {WHITE}Busiest hour:{RESET} {MAGENTA}{BOLD}{day_full[day_order[weekday]]}s at {hour:02d}:00{RESET}"
+              f" {DIM}({count:,} requests){RESET}")
         print()
     
     # ═══════════════════════════════════════════════════════════════════════════
@@ -1333,7 +1810,7 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
     
     wait_for_tab()
     
-    print("\033[2J\033[H", end="")
+    clear_screen()
     
     # Build the summary card data
     top_model = sorted_models[0][0] if sorted_models else "N/A"
@@ -1344,9 +1821,9 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
     power_day = day_full[best_day] if best_day else "N/A"
     
     peak_day_str = "N/A"
-    if stats.get('most_productive_day'):
-        d = stats['most_productive_day']['date']
-        peak_day_str = f"{d.strftime('%b %d')} ({stats['most_productive_day']['lines']:,})"
+    if stats.best_day:
+        d = stats.best_day.date
+        peak_day_str = f"{d.strftime('%b %d')} ({stats.best_day.lines:,})"
     
     # Token stats (includes cache tokens to match Cursor dashboard)
     total_tokens_val = "N/A"
@@ -1356,16 +1833,16 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
         total_tokens_val = format_large_number(total_tok, " tokens")
     
     # Pre-format all values (total lines = added + deleted)
-    total_accepted_lines = stats['accepted_lines_added'] + stats['accepted_lines_deleted']
+    total_accepted_lines = stats.accepted_lines_added + stats.accepted_lines_deleted
     lines_val = f"{total_accepted_lines:,}"
-    requests_val = f"{stats['total_agent_requests']:,}"
-    active_val = f"{stats['active_days']} / {total_days_in_period}"
-    streak_val = f"{stats['streak_longest']} days"
+    requests_val = f"{stats.total_agent_requests:,}"
+    active_val = f"{stats.active_days} / {total_days_in_period}"
+    streak_val = f"{stats.streak_longest} days"
     accept_val = f"{int(acceptance_rate)}%"
     
     # Tab acceptance stats
-    tab_shown = stats.get('total_tabs_shown', 0)
-    tab_accepted = stats.get('total_tabs_accepted', 0)
+    tab_shown = stats.total_tabs_shown
+    tab_accepted = stats.total_tabs_accepted
     tab_rate = (tab_accepted / tab_shown * 100) if tab_shown > 0 else 0
     tab_val = f"{tab_accepted:,} ({tab_rate:.0f}%)"
     
@@ -1375,7 +1852,7 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
     def animate_line(line, delay=0.02):
         """Print line with animation."""
         print(line)
-        time.sleep(delay)
+        pause(delay)
     
     def make_stat_row(label, value):
         """Create a stat row with fixed width alignment."""
@@ -1395,7 +1872,7 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
     
     # Animated reveal
     print()
-    time.sleep(0.3)
+    pause(0.3)
     
     # Top border
     animate_line(f"  {CYAN}┌{'─' * W}┐{RESET}", 0.05)
@@ -1436,7 +1913,7 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
     animate_line(f"  {CYAN}└{'─' * W}┘{RESET}", 0.05)
     
     print()
-    time.sleep(0.3)
+    pause(0.3)
     print(f"  {DIM}Screenshot this to share! 📸{RESET}")
     print()
     
@@ -1444,10 +1921,13 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
     print(f"  {DIM}{'─' * 60}{RESET}")
     print()
     final_msg = "Keep shipping in 2026"
-    for i in range(len(final_msg) + 1):
-        sys.stdout.write(f"\r  {CYAN}{BOLD}{final_msg[:i]}{RESET}")
-        sys.stdout.flush()
-        time.sleep(0.015)
+    if ANIMATE:
+        for i in range(len(final_msg) + 1):
+            sys.stdout.write(f"\r  {CYAN}{BOLD}{final_msg[:i]}{RESET}")
+            sys.stdout.flush()
+            pause(0.015)
+    else:
+        sys.stdout.write(f"  {CYAN}{BOLD}{final_msg}{RESET}")
     print(" 🚀")
     print()
     print(f"  {DIM}{'─' * 60}{RESET}")
@@ -1463,7 +1943,16 @@ def print_wrapped_stats(stats, raw_data, token_stats=None):
         'day_full': day_full,
         'sorted_models': sorted_models,
         'sorted_months': sorted_months,
-        'total_days': total_days_in_period
+        'total_days': total_days_in_period,
+        'window': window,
+        'rollup': rollup,
+        'metrics': metrics,
+        'heatmap': heatmap,
+        'range_index': metrics['range_index'],
+        'token_quantiles': {
+            'overall': token_stats.get('quantiles'),
+            'models': token_stats.get('model_quantiles')
+        } if token_stats else None
     }
     
 
@@ -1473,13 +1962,15 @@ def generate_terminal_image(wrapped_data):
     if not HAS_PIL:
         return None
     
+    from PIL import Image, ImageDraw, ImageFont
+    
     # Extract data for the card
     stats = wrapped_data['stats']
     acceptance_rate = wrapped_data['acceptance_rate']
     sorted_models = wrapped_data['sorted_models']
     best_day = wrapped_data['best_day']
     day_full = wrapped_data['day_full']
-    total_days = wrapped_data.get('total_days', 199)
+    total_days = wrapped_data.get('total_days', DEFAULT_WINDOW.days)
     token_stats = wrapped_data.get('token_stats')
     
     # Prepare display values
@@ -1496,8 +1987,8 @@ def generate_terminal_image(wrapped_data):
                     token_stats.get('total_cache_read', 0) + token_stats.get('total_cache_write', 0))
         total_tokens = format_large_number(total_tok, " tokens")
     
-    tab_shown = stats.get('total_tabs_shown', 0)
-    tab_accepted = stats.get('total_tabs_accepted', 0)
+    tab_shown = stats.total_tabs_shown
+    tab_accepted = stats.total_tabs_accepted
     tab_rate = (tab_accepted / tab_shown * 100) if tab_shown > 0 else 0
     tabs_val = f"{tab_accepted:,} ({tab_rate:.0f}%)"
     
@@ -1639,14 +2130,14 @@ def generate_terminal_image(wrapped_data):
     current_y += section_spacing
     
     # === STATS SECTION ===
-    total_accepted_lines = stats['accepted_lines_added'] + stats['accepted_lines_deleted']
+    total_accepted_lines = stats.accepted_lines_added + stats.accepted_lines_deleted
     stats_data = [
         ("Lines Accepted", f"{total_accepted_lines:,}"),
-        ("Agent Requests", f"{stats['total_agent_requests']:,}"),
+        ("Agent Requests", f"{stats.total_agent_requests:,}"),
         ("Total Tokens", total_tokens),
         ("Tabs Accepted", tabs_val),
-        ("Active Days", f"{stats['active_days']} / {total_days}"),
-        ("Longest Streak", f"{stats['streak_longest']} days"),
+        ("Active Days", f"{stats.active_days} / {total_days}"),
+        ("Longest Streak", f"{stats.streak_longest} days"),
     ]
     
     def draw_stat_row(y, label, value, highlight=False):
@@ -1735,7 +2226,7 @@ def generate_ascii_card(wrapped_data):
     sorted_models = wrapped_data['sorted_models']
     best_day = wrapped_data['best_day']
     day_full = wrapped_data['day_full']
-    total_days = wrapped_data.get('total_days', 199)
+    total_days = wrapped_data.get('total_days', DEFAULT_WINDOW.days)
     token_stats = wrapped_data.get('token_stats')
     
     top_model = sorted_models[0][0] if sorted_models else "N/A"
@@ -1753,19 +2244,19 @@ def generate_ascii_card(wrapped_data):
         total_tokens = format_large_number(total_tok, " tokens")
     
     # Tab stats
-    tab_shown = stats.get('total_tabs_shown', 0)
-    tab_accepted = stats.get('total_tabs_accepted', 0)
+    tab_shown = stats.total_tabs_shown
+    tab_accepted = stats.total_tabs_accepted
     tab_rate = (tab_accepted / tab_shown * 100) if tab_shown > 0 else 0
     tabs_val = f"{tab_accepted:,} ({tab_rate:.0f}%)"
     
     # Pre-format values - all padded to exactly 15 chars (total lines = added + deleted)
-    total_accepted_lines = stats['accepted_lines_added'] + stats['accepted_lines_deleted']
+    total_accepted_lines = stats.accepted_lines_added + stats.accepted_lines_deleted
     lines_val = f"{total_accepted_lines:,}".rjust(15)
-    requests_val = f"{stats['total_agent_requests']:,}".rjust(15)
+    requests_val = f"{stats.total_agent_requests:,}".rjust(15)
     tokens_val = total_tokens.rjust(15)
     tabs_formatted = tabs_val.rjust(15)
-    active_val = f"{stats['active_days']} / {total_days}".rjust(15)
-    streak_val = f"{stats['streak_longest']} days".rjust(15)
+    active_val = f"{stats.active_days} / {total_days}".rjust(15)
+    streak_val = f"{stats.streak_longest} days".rjust(15)
     top_model_val = top_model.rjust(18)
     power_day_val = power_day.rjust(18)
     
@@ -1809,12 +2300,12 @@ def generate_tweet(wrapped_data):
     acceptance_rate = wrapped_data['acceptance_rate']
     
     # Keep it concise for Twitter
-    total_lines = stats['accepted_lines_added'] + stats['accepted_lines_deleted']
+    total_lines = stats.accepted_lines_added + stats.accepted_lines_deleted
     tweet = f"""My Cursor Wrapped 2025 🚀
 
 {total_lines:,} lines of AI code
-{stats['total_agent_requests']:,} agent requests  
-{stats['streak_longest']} day streak
+{stats.total_agent_requests:,} agent requests  
+{stats.streak_longest} day streak
 {int(acceptance_rate)}% acceptance rate
 
 Get yours ↓
@@ -1897,6 +2388,50 @@ def open_twitter_compose(tweet):
     return False
 
 
+def explore_date_range(range_index, window):
+    """Ask for a date range and print its totals and longest streak from the range index."""
+    CYAN = "\033[96m"
+    YELLOW = "\033[93m"
+    WHITE = "\033[97m"
+    DIM = "\033[2m"
+    BOLD = "\033[1m"
+    RESET = "\033[0m"
+    
+    print()
+    print(f"  {DIM}Dates as YYYY-MM-DD, blank for the start/end of {window.label()}{RESET}")
+    try:
+        since = input(f"  {WHITE}From:{RESET} ").strip()
+        until = input(f"  {WHITE}To:{RESET} ").strip()
+        start = date.fromisoformat(since) if since else window.start
+        end = date.fromisoformat(until) if until else window.end
+        period = ReportWindow(start, end)
+    except ValueError as e:
+        print(f"\n  {YELLOW}⚠{RESET}  {e}\n")
+        return
+    except (KeyboardInterrupt, EOFError):
+        print()
+        return
+    
+    totals = range_index.totals(period.start, period.end)
+    streak, streak_start = range_index.longest_streak(period.start, period.end)
+    print()
+    print(f"  {CYAN}{BOLD}{period.label()}{RESET}")
+    print(f"  {WHITE}Lines of code     {RESET}{YELLOW}{totals['lines']:>12,}{RESET}")
+    print(f"  {WHITE}Accepted lines    {RESET}{YELLOW}{totals['accepted_lines']:>12,}{RESET}")
+    print(f"  {WHITE}Agent requests    {RESET}{YELLOW}{totals['agent_requests']:>12,}{RESET}")
+    print(f"  {WHITE}Tabs accepted     {RESET}{YELLOW}{totals['tabs_accepted']:>12,}{RESET}"
+          f"  {DIM}of {totals['tabs_shown']:,} shown{RESET}")
+    print(f"  {WHITE}Active days       {RESET}{YELLOW}{totals['active_days']:>12,}{RESET}"
+          f"  {DIM}of {period.days}{RESET}")
+    if streak:
+        streak_end = streak_start + timedelta(days=streak - 1)
+        print(f"  {WHITE}Longest streak    {RESET}{YELLOW}{streak:>7,} days{RESET}"
+              f"  {DIM}{ReportWindow(streak_start, streak_end).label()}{RESET}")
+    else:
+        print(f"  {WHITE}Longest streak    {RESET}{YELLOW}{0:>7} days{RESET}")
+    print()
+
+
 def show_menu(wrapped_data):
     """Show replay/share menu after wrapped display."""
     CYAN = "\033[96m"
@@ -1914,21 +2449,26 @@ def show_menu(wrapped_data):
         print(f"  {WHITE}[1]{RESET} Replay Wrapped 🔄")
         print(f"  {WHITE}[2]{RESET} Share via iMessage 💬")
         print(f"  {WHITE}[3]{RESET} Share on 𝕏")
-        print(f"  {WHITE}[4]{RESET} Exit")
+        print(f"  {WHITE}[4]{RESET} Explore a date range 🔎")
+        print(f"  {WHITE}[5]{RESET} Exit")
         print()
         
         try:
-            choice = input(f"  {WHITE}Enter choice (1-4):{RESET} ").strip()
+            choice = input(f"  {WHITE}Enter choice (1-5):{RESET} ").strip()
         except (KeyboardInterrupt, EOFError):
             print()
             break
         
         if choice == '1':
-            print("\033[2J\033[H", end="")
+            clear_screen()
             print_wrapped_stats(
                 wrapped_data['stats'], 
                 wrapped_data['raw_data'], 
-                wrapped_data['token_stats']
+                wrapped_data['token_stats'],
+                wrapped_data.get('rollup'),
+                wrapped_data.get('window', DEFAULT_WINDOW),
+                wrapped_data.get('metrics'),
+                wrapped_data.get('heatmap')
             )
         elif choice == '2':
             # iMessage - generate image, copy to clipboard, open Messages
@@ -2132,38 +2672,192 @@ def show_menu(wrapped_data):
                 print()
             
         elif choice == '4':
+            window = wrapped_data.get('window', DEFAULT_WINDOW)
+            if wrapped_data.get('range_index') is None:
+                rollup = wrapped_data.get('rollup') or build_rollup(wrapped_data['raw_data'], window=window)
+                wrapped_data['range_index'] = RangeIndex.from_rollup(rollup)
+            explore_date_range(wrapped_data['range_index'], window)
+            
+        elif choice == '5':
             print(f"\n  {DIM}Keep shipping! 🚀{RESET}\n")
             break
         else:
-            print(f"\n  {DIM}Invalid choice. Please enter 1-4.{RESET}\n")
+            print(f"\n  {DIM}Invalid choice. Please enter 1-5.{RESET}\n")
 
 
-def main():
+def fetch_and_analyze(auth_cookie, client, store, processes=1, window=DEFAULT_WINDOW, cache=None):
+    """Fetch analytics and usage events side by side, analyzing each as it lands.
+    
+    Returns (raw_data, stats, token_stats).
+    """
+    
+    print("\nFetching your Cursor data...")
+    progress = FetchProgress('Analytics', 'Usage events')
+    
+    raw_data = stats = token_stats = None
+    
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        analytics_future = executor.submit(
+            sync_analytics, auth_cookie, client, store, FETCH_WORKERS, progress.tracker('Analytics'), window
+        )
+        events_future = executor.submit(
+            sync_token_usage, auth_cookie, client, store, FETCH_WORKERS, progress.tracker('Usage events'), window
+        )
+        
+        for future in as_completed([analytics_future, events_future]):
+            if future is analytics_future:
+                raw_data = future.result()
+                stats = analyze_yearly_data(raw_data, window, cache)
+            else:
+                token_events = future.result()
+                token_stats = analyze_token_usage(token_events, processes, window, cache) if token_events else None
+    
+    progress.close()
+    store.save()
+    
+    days = len(raw_data.get('dailyMetrics', [])) if raw_data else 0
+    events = token_stats['event_count'] if token_stats else 0
+    print(f"   Got {days} days of data and {events} token usage events")
+    
+    return raw_data, stats, token_stats
+
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(prog="cursor-wrapped", description="Your Cursor year in review")
+    parser.add_argument("--token", metavar="TOKEN",
+                        help=f"WorkosCursorSessionToken to use instead of signing in (visible in the process "
+                             f"list - prefer --token-stdin or ${TOKEN_ENV_VAR})")
+    parser.add_argument("--token-stdin", action="store_true",
+                        help="read the session token from the first line of stdin")
+    parser.add_argument("--no-animation", action="store_true",
+                        help="print every slide at once without pauses or key-press prompts, and skip the menu")
+    parser.add_argument("--login", action="store_true",
+                        help="ignore the saved session and sign in through the browser again")
+    parser.add_argument("--refresh", action="store_true",
+                        help="ignore cached API responses and fetch everything fresh")
+    parser.add_argument("--save-snapshot", nargs="?", const="", metavar="PATH",
+                        help="after fetching, save the raw data for --offline (default: ~/.cursor-wrapped/snapshot.json)")
+    parser.add_argument("--offline", nargs="?", const="", metavar="PATH",
+                        help="skip sign-in and fetching; replay a snapshot saved with --save-snapshot")
+    parser.add_argument("--stream", action="store_true",
+                        help="analyze usage events page by page as they arrive without storing them "
+                             "(flat memory for very large histories; every run fetches everything again)")
+    period = parser.add_argument_group("reporting window (default: June 1 - December 16, 2025)")
+    period.add_argument("--year", type=int, metavar="YYYY", help="report on a calendar year")
+    period.add_argument("--last-days", type=int, metavar="N", help="report on the last N days")
+    period.add_argument("--since", type=date.fromisoformat, metavar="YYYY-MM-DD", help="first day to report on")
+    period.add_argument("--until", type=date.fromisoformat, metavar="YYYY-MM-DD",
+                        help="last day to report on (default: today when --since is given)")
+    parser.add_argument("--processes", type=int, default=1, metavar="N",
+                        help="analyze large event sets (e.g. a team export replayed with --offline) on N processes")
+    parser.add_argument("--timezone", metavar="NAME",
+                        help="timezone for the hour-of-day heatmap, e.g. Europe/Berlin or UTC (default: local time)")
+    args = parser.parse_args(argv)
+    if sum(bool(x) for x in (args.year, args.last_days, args.since or args.until)) > 1:
+        parser.error("use only one of --year, --last-days and --since/--until")
+    if args.last_days is not None and args.last_days < 1:
+        parser.error("--last-days must be at least 1")
+    if args.stream and (args.offline is not None or args.save_snapshot is not None):
+        parser.error("--stream keeps no events, so it can't be combined with --offline or --save-snapshot")
+    return args
+
+
+def main(argv=None):
     """Main function."""
     
-    auth_cookie = get_auth_cookie()
+    global ANIMATE
     
-    if not auth_cookie:
-        print("\nCould not get auth token. Please try again.")
-        return
+    args = parse_args(argv)
     
-    raw_data = fetch_yearly_analytics(auth_cookie)
+    if args.no_animation:
+        ANIMATE = False
     
-    if not raw_data:
-        print("\nCould not fetch analytics data.")
+    try:
+        window = window_from_args(args)
+    except ValueError as e:
+        print(f"\nInvalid reporting window: {e}")
         return
     
-    token_events = fetch_token_usage(auth_cookie)
-    token_stats = analyze_token_usage(token_events) if token_events else None
+    try:
+        tz = get_timezone(args.timezone)
+    except ValueError as e:
+        print(f"\nInvalid timezone: {e}")
+        return
     
-    stats = analyze_yearly_data(raw_data)
+    if args.offline is not None:
+        # Replay a saved snapshot - no browser, no network
+        snapshot = load_snapshot(args.offline or None)
+        if not snapshot:
+            print(f"\nNo snapshot found at {snapshot_path(args.offline or None)}")
+            print("   Run with --save-snapshot first to create one.")
+            return
+        
+        raw_data = snapshot['analytics']
+        token_events = snapshot.get('events') or []
+        cache = AnalysisCache(ANALYSIS_VERSION)
+        stats = analyze_yearly_data(raw_data, window, cache)
+        token_stats = analyze_token_usage(token_events, args.processes, window, cache) if token_events else None
+        rollup = build_rollup(raw_data, token_events, window, cache)
+        heatmap = analyze_activity(token_events, window, tz, cache)
+    else:
+        auth_cookie, token_source = read_token_input(args)
+        if auth_cookie:
+            print(f"Using session token from {token_source}")
+        else:
+            auth_cookie = get_session_token(force_login=args.login)
+        
+        if not auth_cookie:
+            print("\nCould not get auth token. Please try again.")
+            return
+        
+        # Both fetches run at once, each with up to FETCH_WORKERS requests in flight
+        client = CursorClient(auth_cookie, pool_size=FETCH_WORKERS * 2, cache=ResponseCache(refresh=args.refresh))
+        cache = AnalysisCache(ANALYSIS_VERSION)
+        
+        if args.stream:
+            # Usage events are analyzed page by page and never kept, so
+            # memory stays flat however many there are; nothing is stored
+            raw_data = fetch_yearly_analytics(auth_cookie, client=client, sharded=True, workers=FETCH_WORKERS,
+                                              window=window)
+            stats = analyze_yearly_data(raw_data, window)
+            try:
+                token_stats, heatmap = stream_token_usage(auth_cookie, client, window=window,
+                                                          account=account_id(auth_cookie), tz=tz)
+            except IncompleteFetchError as e:
+                print(f"\n   Token usage incomplete: {e} - skipping the token slides, run again to retry")
+                token_stats = heatmap = None
+        else:
+            store = EventStore(account_id(auth_cookie)).load()
+            raw_data, stats, token_stats = fetch_and_analyze(auth_cookie, client, store, args.processes, window, cache)
+        
+        if not raw_data:
+            print("\nCould not fetch analytics data.")
+            return
+        
+        conn = client.connection_stats()
+        print(f"   {conn['requests']} requests over {conn['connections']} connections ({conn['reused']} reused)")
+        fetch = client.fetch_stats()
+        print(f"   Concurrency settled at {fetch['concurrency']} (peak {fetch['peak_concurrency']}), "
+              f"{fetch['retries']} retries, {fetch['failures']} failed requests, {fetch['cache_hits']} served from cache")
+        
+        if args.stream:
+            rollup = build_rollup(raw_data, None, window)
+        else:
+            if args.save_snapshot is not None:
+                path = save_snapshot(raw_data, store.events, args.save_snapshot or None)
+                print(f"   Saved snapshot to {path}")
+            
+            rollup = build_rollup(raw_data, store.events, window, cache)
+            heatmap = analyze_activity(store.events, window, tz, cache)
     
-    wrapped_data = print_wrapped_stats(stats, raw_data, token_stats)
+    wrapped_data = print_wrapped_stats(stats, raw_data, token_stats, rollup, window, heatmap=heatmap)
     
     if wrapped_data:
         wrapped_data['raw_data'] = raw_data
         wrapped_data['token_stats'] = token_stats
-        show_menu(wrapped_data)
+        if ANIMATE and sys.stdin.isatty():
+            show_menu(wrapped_data)
 
 
 if __name__ == "__main__":
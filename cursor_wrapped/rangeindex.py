@@ -0,0 +1,120 @@
+"""
+Range index
+Prefix sums over the daily series and a run-length index of active-day
+streaks, so the totals of any date range are two lookups and its longest
+streak a couple of binary searches - no walk over the days in between.
+"""
+
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from cursor_wrapped.columnar import day_date, day_number, day_runs, get_numpy, vector
+
+# Metrics with a prefix-sum array (RollupCube day-level metrics)
+INDEXED_METRICS = [
+    'lines', 'lines_added', 'accepted_lines', 'agent_requests', 'tabs_shown', 'tabs_accepted', 'active_days'
+]
+
+
+def prefix_sums(values):
+    """[0, v0, v0 + v1, ...] - the sum of values[i:j] is p[j] - p[i]."""
+    np = get_numpy()
+    if np is not None:
+        return [0] + np.cumsum(vector(values)).tolist()
+    return list(accumulate(values, initial=0))
+
+
+class RangeIndex:
+    """Constant-time range totals and logarithmic longest-streak queries.
+
+    Built over a dense day axis (one slot per calendar day from first_day).
+    Streaks are the sorted (first_day, length) runs of active days, with a
+    sparse table of running maxima over their lengths: the longest run
+    among any span of runs is the larger of two overlapping table entries.
+    """
+
+    def __init__(self, first_day, daily):
+        self.first_day = first_day
+        self.size = len(daily.get('active_days', []))
+        self.prefix = {metric: prefix_sums(daily.get(metric, [])) for metric in INDEXED_METRICS}
+
+        self.runs = []
+        if self.size:
+            active = [value > 0 for value in daily['active_days']]
+            self.runs = day_runs(list(range(first_day, first_day + self.size)), active)
+        self.run_starts = [first for first, _ in self.runs]
+        self.run_ends = [first + length - 1 for first, length in self.runs]
+
+        # levels[k][i] = index of the longest run in runs[i:i + 2**k] (earliest on ties)
+        lengths = [length for _, length in self.runs]
+        self.levels = [list(range(len(lengths)))] if lengths else []
+        span = 1
+        while self.levels and span * 2 <= len(lengths):
+            prev = self.levels[-1]
+            self.levels.append([
+                a if lengths[a] >= lengths[b] else b for a, b in zip(prev, prev[span:])
+            ])
+            span *= 2
+
+    @classmethod
+    def from_rollup(cls, cube):
+        """Index the day-level sums of a RollupCube."""
+        return cls(cube.first_day, cube.sums['day'])
+
+    def day_slots(self, start=None, end=None):
+        """Dense axis bounds [lo, hi) for dates start..end (inclusive), clipped to the index."""
+        if self.first_day is None:
+            return 0, 0
+        lo = 0 if start is None else min(max(day_number(start) - self.first_day, 0), self.size)
+        hi = self.size if end is None else min(max(day_number(end) - self.first_day + 1, 0), self.size)
+        return lo, max(lo, hi)
+
+    def total(self, metric, start=None, end=None):
+        """Sum of a metric over dates start..end (inclusive)."""
+        if metric not in self.prefix:
+            raise ValueError(f"unknown metric {metric!r}")
+        lo, hi = self.day_slots(start, end)
+        prefix = self.prefix[metric]
+        return prefix[hi] - prefix[lo]
+
+    def totals(self, start=None, end=None):
+        """{metric: sum} over dates start..end for every indexed metric."""
+        lo, hi = self.day_slots(start, end)
+        return {metric: prefix[hi] - prefix[lo] for metric, prefix in self.prefix.items()}
+
+    def longest_run(self, i, j):
+        """Index of the longest of runs[i:j] (j > i)."""
+        level = (j - i).bit_length() - 1
+        a, b = self.levels[level][i], self.levels[level][j - (1 << level)]
+        return a if self.runs[a][1] >= self.runs[b][1] else b
+
+    def longest_streak(self, start=None, end=None):
+        """(length, first date) of the longest active streak within start..end.
+
+        Runs cut by either end of the range only count their days inside it.
+        Returns (0, None) when the range has no active day.
+        """
+        lo, hi = self.day_slots(start, end)
+        if lo >= hi:
+            return 0, None
+        first, last = self.first_day + lo, self.first_day + hi - 1
+
+        i = bisect_left(self.run_ends, first)
+        j = bisect_right(self.run_starts, last)
+        if i >= j:
+            return 0, None
+
+        def clipped(k):
+            run_first = max(self.run_starts[k], first)
+            return min(self.run_ends[k], last) - run_first + 1, run_first
+
+        best = clipped(i)
+        if j - i > 2:
+            k = self.longest_run(i + 1, j - 1)
+            if self.runs[k][1] > best[0]:
+                best = (self.runs[k][1], self.runs[k][0])
+        if j - i > 1:
+            edge = clipped(j - 1)
+            if edge[0] > best[0]:
+                best = edge
+        return best[0], day_date(best[1])
@@ -0,0 +1,180 @@
+"""
+Rollup cube
+Daily metrics and usage events rolled up once by day, ISO week, month and
+weekday, so any "date range x granularity x metric" question is answered
+from the precomputed sums instead of the raw data.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+from cursor_wrapped.columnar import (
+    DAY_MS, WEEKDAYS, any_positive, day_date, day_number, elementwise_sum, group_sum, month_label, month_number
+)
+
+GRANULARITIES = ['day', 'week', 'month', 'weekday']
+
+# Metrics from dailyMetrics: name -> DailyTable columns summed for it
+DAILY_METRICS = {
+    'lines': ['lines_added', 'lines_deleted'],
+    'lines_added': ['lines_added'],
+    'lines_deleted': ['lines_deleted'],
+    'accepted_lines': ['accepted_lines_added', 'accepted_lines_deleted'],
+    'agent_requests': ['agent_requests'],
+    'tabs_shown': ['tabs_shown'],
+    'tabs_accepted': ['tabs_accepted'],
+    'applies': ['applies'],
+    'accepts': ['accepts'],
+    'rejects': ['rejects'],
+}
+
+# Metrics from usage events: name -> EventTable column (None counts events)
+EVENT_METRICS = {
+    'events': None,
+    'input_tokens': 'input_tokens',
+    'output_tokens': 'output_tokens',
+    'cache_write': 'cache_write',
+    'cache_read': 'cache_read',
+    'cents': 'cents',
+}
+
+METRICS = list(DAILY_METRICS) + ['active_days'] + list(EVENT_METRICS)
+
+
+def event_column(events, column):
+    if column is None:
+        return [1] * len(events)
+    return events.cents if column == 'cents' else events[column]
+
+
+class RollupCube:
+    """Per-metric sums on a dense day axis, rolled up by week and month.
+
+    Every granularity is a list of period start days with one array of
+    sums per metric. A range query takes the periods fully inside the
+    range from the rollup and only re-adds days for the two partial
+    periods at its edges.
+    """
+
+    def __init__(self):
+        self.first_day = None
+        self.periods = {name: [] for name in GRANULARITIES}   # period start day numbers
+        self.sums = {name: {} for name in GRANULARITIES}      # granularity -> metric -> sums
+
+    @classmethod
+    def build(cls, table, events=None):
+        """Roll up a DailyTable and (optionally) an EventTable of usage events."""
+        cube = cls()
+        event_days = None
+        days = list(table.day)
+        if events is not None and len(events):
+            event_days = [ts // DAY_MS for ts in events.timestamp]
+            days += [min(event_days), max(event_days)]
+        if not days:
+            return cube
+
+        cube.first_day = min(days)
+        n_days = max(days) - cube.first_day + 1
+        cube.periods['day'] = list(range(cube.first_day, cube.first_day + n_days))
+
+        # Day level: scatter the table rows and events onto the dense axis
+        daily = cube.sums['day']
+        offsets = [day - cube.first_day for day in table.day]
+        for metric, columns in DAILY_METRICS.items():
+            daily[metric] = group_sum(offsets, elementwise_sum(*(table[c] for c in columns)), n_days)
+        active = any_positive(elementwise_sum(table['lines_added'], table['lines_deleted']),
+                              table['agent_requests'], table['tabs_shown'])
+        daily['active_days'] = group_sum(offsets, [int(a) for a in active], n_days)
+
+        event_offsets = [day - cube.first_day for day in event_days] if event_days else []
+        for metric, column in EVENT_METRICS.items():
+            if event_days:
+                daily[metric] = group_sum(event_offsets, event_column(events, column), n_days)
+            else:
+                daily[metric] = [0] * n_days
+
+        # Weeks (Monday start, as ISO weeks) and months from the day level
+        day_dates = [day_date(day) for day in cube.periods['day']]
+        week_starts = [day - d.weekday() for day, d in zip(cube.periods['day'], day_dates)]
+        months = [month_number(d) for d in day_dates]
+        for name, keys in [('week', week_starts), ('month', months)]:
+            cube.periods[name] = sorted(set(keys))
+            index = {key: i for i, key in enumerate(cube.periods[name])}
+            slots = [index[key] for key in keys]
+            cube.sums[name] = {metric: group_sum(slots, daily[metric], len(index)) for metric in METRICS}
+        # Months are stored by their first day so every granularity shares one axis
+        cube.periods['month'] = [day_number(date(m // 12, m % 12 + 1, 1)) for m in cube.periods['month']]
+
+        cube.periods['weekday'] = list(range(7))
+        weekdays = [d.weekday() for d in day_dates]
+        cube.sums['weekday'] = {metric: group_sum(weekdays, daily[metric], 7) for metric in METRICS}
+        return cube
+
+    def day_range(self, start=None, end=None):
+        """Dense day-axis indexes [lo, hi) for dates start..end (inclusive)."""
+        days = self.periods['day']
+        lo = 0 if start is None else bisect_left(days, day_number(start))
+        hi = len(days) if end is None else bisect_right(days, day_number(end))
+        return lo, max(lo, hi)
+
+    def query(self, metric, granularity='day', start=None, end=None):
+        """[(period start date, sum)] for the periods overlapping start..end.
+
+        Periods cut by the range only count the days inside it. For
+        'weekday' the periods are 0 (Monday) to 6.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"unknown metric {metric!r}")
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"unknown granularity {granularity!r}")
+        if self.first_day is None:
+            return [(w, 0) for w in range(7)] if granularity == 'weekday' else []
+
+        lo, hi = self.day_range(start, end)
+        daily = self.sums['day'][metric]
+        if granularity == 'day':
+            return [(day_date(self.periods['day'][i]), daily[i]) for i in range(lo, hi)]
+        if lo >= hi:
+            return [] if granularity != 'weekday' else [(w, 0) for w in range(7)]
+
+        if granularity == 'weekday':
+            if (lo, hi) == (0, len(daily)):
+                return list(enumerate(self.sums['weekday'][metric]))
+            totals = [0] * 7
+            for i in range(lo, hi):
+                totals[(self.first_day + i + 3) % 7] += daily[i]
+            return list(enumerate(totals))
+
+        # Whole periods come from the rollup; the edge ones are re-added from days
+        starts = self.periods[granularity]
+        sums = self.sums[granularity][metric]
+        first_day, last_day = self.first_day + lo, self.first_day + hi - 1
+        p_lo = bisect_right(starts, first_day) - 1
+        p_hi = bisect_right(starts, last_day)
+        result = []
+        for p in range(p_lo, p_hi):
+            p_start = starts[p]
+            p_end = (starts[p + 1] if p + 1 < len(starts) else self.first_day + len(daily)) - 1
+            if p_start >= first_day and p_end <= last_day:
+                value = sums[p]
+            else:
+                value = sum(daily[max(p_start, first_day) - self.first_day:min(p_end, last_day) - self.first_day + 1])
+            result.append((day_date(p_start), value))
+        return result
+
+    def rows(self, granularity, metrics, start=None, end=None):
+        """[(period start, {metric: sum})] for several metrics at once."""
+        columns = [self.query(metric, granularity, start, end) for metric in metrics]
+        return [(column[0][0], {m: c[1] for m, c in zip(metrics, column)}) for column in zip(*columns)]
+
+    @staticmethod
+    def period_label(granularity, period):
+        """Short label for a period returned by query()."""
+        if granularity == 'month':
+            return month_label(month_number(period))
+        if granularity == 'week':
+            year, week, _ = period.isocalendar()
+            return f"{year}-W{week:02d}"
+        if granularity == 'weekday':
+            return WEEKDAYS[period]
+        return period.isoformat()
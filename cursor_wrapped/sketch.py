@@ -0,0 +1,123 @@
+"""
+Quantile sketches
+Mergeable t-digests for per-request token and cost distributions. A digest
+keeps at most about compression / 2 centroids however many values go in,
+and digests of separate chunks merge into one.
+"""
+
+import math
+
+from cursor_wrapped.columnar import get_numpy, vector
+
+# Centroid budget - higher is more accurate and bigger
+DEFAULT_COMPRESSION = 200
+
+# Percentiles reported for every sketch
+QUANTILES = {'p50': 0.5, 'p90': 0.9, 'p99': 0.99}
+
+
+class TDigest:
+    """t-digest with the arcsine scale function.
+
+    Centroids are (mean, weight) pairs sorted by mean. Near the tails they
+    hold few values, so p99 stays accurate while the middle is coarse.
+    """
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means = []
+        self.weights = []
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def scale(self, q):
+        """Where quantile q falls on the k scale; a centroid may span at most 1."""
+        q = min(max(q, 0.0), 1.0)
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    @classmethod
+    def from_values(cls, values, compression=DEFAULT_COMPRESSION):
+        """Digest of a batch of values, sorted and clustered in one pass."""
+        digest = cls(compression)
+        np = get_numpy()
+        if np is not None:
+            v = np.sort(vector(values).astype(np.float64))
+            n = len(v)
+            if not n:
+                return digest
+            # Unit-k-wide buckets over each value's quantile
+            q = (np.arange(n) + 0.5) / n
+            cluster = np.floor(compression / (2 * math.pi) * np.arcsin(2 * q - 1) + compression / 4).astype(np.int64)
+            weights = np.bincount(cluster)
+            sums = np.bincount(cluster, weights=v)
+            keep = weights > 0
+            digest.means = (sums[keep] / weights[keep]).tolist()
+            digest.weights = weights[keep].tolist()
+            digest.min, digest.max = float(v[0]), float(v[-1])
+        else:
+            v = sorted(float(x) for x in values)
+            n = len(v)
+            if not n:
+                return digest
+            last = None
+            for i, x in enumerate(v):
+                bucket = math.floor(digest.scale((i + 0.5) / n) + compression / 4)
+                if bucket == last:
+                    digest.means[-1] += (x - digest.means[-1]) / (digest.weights[-1] + 1)
+                    digest.weights[-1] += 1
+                else:
+                    digest.means.append(x)
+                    digest.weights.append(1)
+                    last = bucket
+            digest.min, digest.max = v[0], v[-1]
+        digest.count = n
+        return digest
+
+    def merge(self, other):
+        """Fold another digest into this one; returns self."""
+        if not other.count:
+            return self
+        total = self.count + other.count
+        centroids = sorted(zip(self.means + other.means, self.weights + other.weights))
+
+        means, weights = [], []
+        done = 0
+        k_start = None
+        for mean, weight in centroids:
+            if weights and self.scale((done + weight) / total) - k_start <= 1:
+                weights[-1] += weight
+                means[-1] += (mean - means[-1]) * weight / weights[-1]
+            else:
+                means.append(mean)
+                weights.append(weight)
+                k_start = self.scale(done / total)
+            done += weight
+
+        self.means, self.weights = means, weights
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.count = total
+        return self
+
+    def quantile(self, q):
+        """Estimated value at quantile q (0-1), or None for an empty digest."""
+        if not self.count:
+            return None
+        target = q * self.count
+        # Interpolate between centroid centres, anchored at the exact min and max
+        prev_center, prev_mean = 0.0, self.min
+        done = 0
+        for mean, weight in zip(self.means, self.weights):
+            center = done + weight / 2
+            if target < center:
+                span = center - prev_center
+                return prev_mean + (mean - prev_mean) * ((target - prev_center) / span if span else 0)
+            prev_center, prev_mean = center, mean
+            done += weight
+        span = self.count - prev_center
+        return prev_mean + (self.max - prev_mean) * ((target - prev_center) / span if span else 0)
+
+    def summary(self):
+        """{'p50': .., 'p90': .., 'p99': ..} for this digest."""
+        return {name: self.quantile(q) for name, q in QUANTILES.items()}
@@ -0,0 +1,87 @@
+"""
+Stats model
+What analyze_yearly_data returns: flat slotted objects instead of nested
+dicts keyed by name. They pickle (to cross process boundaries and into the
+analysis cache) and round-trip through to_json / from_json. The weekday and
+month breakdowns come from the rollup cube (see rollup.RollupCube).
+"""
+
+from cursor_wrapped.columnar import day_date
+
+# Totals over the whole period
+TOTAL_FIELDS = [
+    'total_lines_added', 'total_lines_deleted', 'accepted_lines_added', 'accepted_lines_deleted',
+    'total_applies', 'total_accepts', 'total_rejects', 'total_tabs_shown', 'total_tabs_accepted',
+    'total_agent_requests', 'subscription_included_reqs', 'active_days'
+]
+
+# {name: count} breakdowns from the per-day usage lists
+USAGE_FIELDS = ['model_usage', 'extension_usage', 'tab_extension_usage', 'client_versions']
+
+
+class DayRecord:
+    """One standout day: its day number and what happened on it."""
+
+    __slots__ = ('day', 'lines', 'accepted', 'requests')
+
+    def __init__(self, day, lines=0, accepted=0, requests=0):
+        self.day = day
+        self.lines = lines
+        self.accepted = accepted
+        self.requests = requests
+
+    @property
+    def date(self):
+        return day_date(self.day)
+
+    def to_json(self):
+        return [self.day, self.lines, self.accepted, self.requests]
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(*data) if data else None
+
+    def __eq__(self, other):
+        return isinstance(other, DayRecord) and self.to_json() == other.to_json()
+
+
+class YearlyStats:
+    """Aggregate stats over the days of a reporting window.
+
+    daily is the active days as (day, API date, lines_added,
+    accepted_lines, agent_requests) tuples.
+    """
+
+    __slots__ = TOTAL_FIELDS + USAGE_FIELDS + ['daily', 'busiest_day', 'best_day', 'streak_current', 'streak_longest']
+
+    def __init__(self):
+        for name in TOTAL_FIELDS:
+            setattr(self, name, 0)
+        for name in USAGE_FIELDS:
+            setattr(self, name, {})
+        self.daily = []
+        self.busiest_day = None    # DayRecord with the most agent requests
+        self.best_day = None       # DayRecord with the most lines
+        self.streak_current = 0
+        self.streak_longest = 0
+
+    def to_json(self):
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['daily'] = [list(entry) for entry in self.daily]
+        for name in ('busiest_day', 'best_day'):
+            data[name] = data[name].to_json() if data[name] else None
+        return data
+
+    @classmethod
+    def from_json(cls, data):
+        stats = cls()
+        for name in cls.__slots__:
+            if name in data:
+                setattr(stats, name, data[name])
+        stats.daily = [tuple(entry) for entry in stats.daily]
+        stats.busiest_day = DayRecord.from_json(stats.busiest_day)
+        stats.best_day = DayRecord.from_json(stats.best_day)
+        return stats
+
+    def __eq__(self, other):
+        return isinstance(other, YearlyStats) and self.to_json() == other.to_json()
@@ -0,0 +1,603 @@
+"""
+Local data store
+Everything cursor-wrapped keeps on disk between runs: usage events and raw
+daily metrics, fetch checkpoints, cached API responses, snapshots and the
+saved session token
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+
+from cursor_wrapped.columnar import EventTable
+
+KEYRING_SERVICE = "cursor-wrapped"
+KEYRING_USERNAME = "WorkosCursorSessionToken"
+
+DAY_MS = 86_400_000
+
+# Checkpoints older than this are dropped - pages shift as new events arrive
+CHECKPOINT_MAX_AGE = 6 * 3600
+
+# Memoized analysis results: entries kept in memory, bytes kept on disk
+ANALYSIS_MEMORY_ENTRIES = 32
+ANALYSIS_DISK_BYTES = 64 * 1024 * 1024
+
+
+def data_dir():
+    """Return (and create) the per-user directory for cursor-wrapped data."""
+    path = os.environ.get("CURSOR_WRAPPED_HOME") or os.path.join(os.path.expanduser("~"), ".cursor-wrapped")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+
+def account_id(auth_cookie):
+    """Stable id for the signed-in account.
+
+    The session token looks like "user_XXXX::<jwt>"; the user part stays the
+    same across logins while the JWT rotates. Anything else is hashed.
+    """
+    token = urllib.parse.unquote(auth_cookie or "")
+    if "::" in token:
+        return token.split("::", 1)[0]
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+
+def write_json_atomic(path, data):
+    """Write JSON to a private file without ever leaving a half-written one."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def read_json(path):
+    """Read a JSON file, returning None if it is missing or unreadable."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_event_table(data):
+    """The usage events saved in a store or snapshot file, as an EventTable.
+
+    Files written before events were stored as columns hold the raw API
+    events under 'events' instead; those are converted.
+    """
+    if data.get('event_table'):
+        return EventTable.from_json(data['event_table'])
+    return EventTable.from_events(data.get('events') or [])
+
+
+def add_range(ranges, start, end):
+    """ranges (sorted, disjoint [start, end] pairs, ends inclusive) with start..end added."""
+    merged = []
+    for lo, hi in sorted(ranges + [[start, end]]):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return merged
+
+
+def missing_ranges(ranges, start, end):
+    """[(start, end)] pieces of start..end that ranges doesn't cover."""
+    missing = []
+    for lo, hi in ranges:
+        if hi < start or lo > end:
+            continue
+        if lo > start:
+            missing.append((start, lo - 1))
+        start = max(start, hi + 1)
+    if start <= end:
+        missing.append((start, end))
+    return missing
+
+
+class EventStore:
+    """Usage events (as an EventTable) and raw dailyMetrics days for one account.
+
+    Events are kept newest first (the order the API pages them in) and
+    days are kept sorted by date. event_ranges and analytics_ranges are the
+    [start, end] epoch ms ranges fetched completely so far, so a window
+    reaching outside them knows what is still missing.
+    """
+
+    def __init__(self, account, path=None):
+        self.account = account
+        self.path = path or os.path.join(data_dir(), f"store-{account}.json")
+        self.events = EventTable()
+        self.analytics = None
+        self.event_ranges = []
+        self.analytics_ranges = []
+
+    def load(self):
+        data = read_json(self.path) or {}
+        self.events = load_event_table(data)
+        self.analytics = data.get('analytics')
+        self.event_ranges = data.get('event_ranges')
+        self.analytics_ranges = data.get('analytics_ranges')
+
+        # Stores saved before ranges were recorded: only trust the span the
+        # stored data itself shows
+        if self.event_ranges is None:
+            self.event_ranges = [[min(self.events.timestamp), self.events_high_water_mark()]] if self.events else []
+        if self.analytics_ranges is None:
+            self.analytics_ranges = []
+            resume = self.analytics_resume_date()
+            if resume is not None:
+                first = int(self.analytics['dailyMetrics'][0].get('date', 0))
+                self.analytics_ranges = [[first, resume - 1]]
+        return self
+
+    def save(self):
+        write_json_atomic(self.path, {
+            'account': self.account,
+            'saved_at': int(time.time() * 1000),
+            'event_table': self.events.to_json(),
+            'event_ranges': self.event_ranges,
+            'analytics': self.analytics,
+            'analytics_ranges': self.analytics_ranges
+        })
+
+    def missing_event_ranges(self, start_ms, end_ms):
+        """[(start, end)] parts of start_ms..end_ms whose usage events were never fully fetched."""
+        return missing_ranges(self.event_ranges, start_ms, end_ms)
+
+    def missing_analytics_ranges(self, start_ms, end_ms):
+        """[(start, end)] parts of start_ms..end_ms without complete analytics days."""
+        return missing_ranges(self.analytics_ranges, start_ms, end_ms)
+
+    def mark_events_fetched(self, start_ms, end_ms):
+        """Record that every usage event in start_ms..end_ms has been merged in."""
+        self.event_ranges = add_range(self.event_ranges, start_ms, end_ms)
+
+    def mark_analytics_fetched(self, start_ms, end_ms):
+        """Record that the days in start_ms..end_ms are complete and merged in."""
+        self.analytics_ranges = add_range(self.analytics_ranges, start_ms, end_ms)
+
+    def events_high_water_mark(self):
+        """Timestamp (ms) of the newest stored event, or None."""
+        if not self.events:
+            return None
+        return max(self.events.timestamp)
+
+    def analytics_resume_date(self, now_ms=None):
+        """Start (ms) of the first day that still needs fetching, or None.
+
+        Days before today (UTC) are complete and never change; the last
+        stored day may be today and partial, so it is refetched.
+        """
+        if not self.analytics or not self.analytics.get('dailyMetrics'):
+            return None
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        today = now_ms - now_ms % DAY_MS
+        complete = [int(d.get('date', 0)) for d in self.analytics['dailyMetrics'] if int(d.get('date', 0)) + DAY_MS <= today]
+        if not complete:
+            return None
+        return max(complete) + DAY_MS
+
+    def merge_events(self, new_events):
+        """Add fetched events (an EventTable or raw API events) that are not stored yet.
+
+        New events may be older than the stored ones (a window reaching
+        further back) or overlap them (a fetch resuming at the high-water
+        mark). Returns how many were added.
+        """
+        if not isinstance(new_events, EventTable):
+            new_events = EventTable.from_events(new_events)
+        if not new_events:
+            return 0
+        lo, hi = min(new_events.timestamp), max(new_events.timestamp)
+        # Only stored events within the fetched span can be fetched again
+        seen = {self.events.row(i) for i, ts in enumerate(self.events.timestamp) if lo <= ts <= hi}
+        added = []
+        for i in range(len(new_events)):
+            key = new_events.row(i)
+            if key in seen:
+                continue
+            seen.add(key)
+            added.append(i)
+        if not added:
+            return 0
+
+        merged = new_events.take(added)
+        merged.extend(self.events)
+        timestamps = merged.timestamp
+        if any(timestamps[i] < timestamps[i + 1] for i in range(len(timestamps) - 1)):
+            merged = merged.take(sorted(range(len(merged)), key=lambda i: -timestamps[i]))
+        self.events = merged
+        return len(added)
+
+    def merge_analytics(self, data):
+        """Merge a get-user-analytics response; newer days replace stored ones."""
+        if not data:
+            return 0
+        if not self.analytics:
+            self.analytics = data
+            return len(data.get('dailyMetrics', []))
+
+        days = {str(d.get('date')): d for d in self.analytics.get('dailyMetrics', [])}
+        new_days = data.get('dailyMetrics', [])
+        for day in new_days:
+            days[str(day.get('date'))] = day
+
+        merged = dict(self.analytics)
+        merged.update({k: v for k, v in data.items() if k != 'dailyMetrics'})
+        merged['dailyMetrics'] = sorted(days.values(), key=lambda d: int(d.get('date', 0)))
+        self.analytics = merged
+        return len(new_days)
+
+
+def prune_checkpoints(directory, max_age=CHECKPOINT_MAX_AGE):
+    """Delete the checkpoint files in directory older than max_age (seconds).
+
+    Their fetch was never resumed; past that age its pages can't be trusted.
+    """
+    now = time.time()
+    for name in os.listdir(directory):
+        if not (name.startswith("checkpoint-") and name.endswith(".jsonl")):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if now - os.path.getmtime(path) > max_age:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+class FetchCheckpoint:
+    """Append-only record of the usage-event pages fetched so far.
+
+    One file per account and date range. Each completed page is appended as
+    a JSON line, so an interrupted fetch can pick up where it stopped and a
+    torn final line only loses that one page. A range that ends in the
+    future is keyed by its start and end_ts 'open', since its end date
+    moves along with today.
+
+    Pages are fetched by offset, so the range must not grow while they are:
+    a range that ends in the future is cut at the time the checkpoint was
+    started (see freeze), and a resumed fetch keeps that cut.
+    """
+
+    def __init__(self, account, start_ts, end_ts, path=None):
+        self.path = path or os.path.join(data_dir(), f"checkpoint-{account}-{start_ts}-{end_ts}.jsonl")
+        self.pages = {}
+        self.end_ts = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        try:
+            age = time.time() - os.path.getmtime(self.path)
+        except OSError:
+            return self
+        if age > CHECKPOINT_MAX_AGE:
+            self.clear()
+            return self
+
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if 'end_ts' in entry:
+                    self.end_ts = entry['end_ts']
+                    continue
+                self.pages[entry['page']] = entry['data']
+        if self.pages and self.end_ts is None:
+            # Written without a fixed end - its offsets can't be trusted
+            self.clear()
+        return self
+
+    def freeze(self, end_ts):
+        """The end (epoch ms string) of the range to fetch.
+
+        A resumed fetch keeps the end its checkpoint started with; a new one
+        records end_ts, so new events can't shift the pages of a retry.
+        """
+        if self.pages:
+            return self.end_ts
+        # Starting over: also sweep the checkpoints of fetches never resumed
+        prune_checkpoints(os.path.dirname(self.path))
+        self.end_ts = str(end_ts)
+        with self.lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                f.write(json.dumps({'end_ts': self.end_ts}) + "\n")
+        return self.end_ts
+
+    def record(self, page, data):
+        """Persist one fetched page.
+
+        The page is only written to disk; keeping it in memory too would
+        hold every raw page for the length of the fetch.
+        """
+        data = {
+            'totalUsageEventsCount': data.get('totalUsageEventsCount', 0),
+            'usageEventsDisplay': data.get('usageEventsDisplay', [])
+        }
+        line = json.dumps({'page': page, 'data': data}) + "\n"
+        with self.lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            with os.fdopen(fd, "a") as f:
+                f.write(line)
+
+    def clear(self):
+        """Forget the checkpoint once the fetch it covers has completed."""
+        self.pages = {}
+        self.end_ts = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class ResponseCache:
+    """On-disk cache of decoded dashboard API responses.
+
+    Entries are keyed by a hash of the session token, API path and payload.
+    Only responses for ranges that ended before today are cached: those can
+    never change and are kept indefinitely. A range reaching today is cut
+    at the time of the request, so its payload - and key - is never sent
+    again and caching it would only fill the disk. With refresh=True
+    lookups always miss but fresh responses are still written back.
+    """
+
+    def __init__(self, path=None, refresh=False):
+        self.path = path or os.path.join(data_dir(), "cache")
+        self.refresh = refresh
+        os.makedirs(self.path, mode=0o700, exist_ok=True)
+        self.sweep()
+
+    def sweep(self):
+        """Delete entries that expire - earlier versions cached open ranges for a while.
+
+        expires_at is written right after saved_at, so the start of each
+        file is enough to tell; the (large) data is never read.
+        """
+        now = time.time()
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+            try:
+                with open(path, "rb") as f:
+                    head = f.read(128)
+                match = re.search(rb'"expires_at": ([0-9.e+]+)', head)
+                if match and float(match.group(1)) < now:
+                    os.remove(path)
+            except (OSError, ValueError):
+                pass
+
+    @staticmethod
+    def key(auth_cookie, api_path, payload):
+        blob = json.dumps([auth_cookie, api_path, payload], sort_keys=True)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        if self.refresh:
+            return None
+        path = os.path.join(self.path, f"{key}.json")
+        entry = read_json(path)
+        if not entry:
+            return None
+        if entry.get('expires_at') is not None and entry['expires_at'] < time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry.get('data')
+
+    def put(self, key, data, payload):
+        now = time.time()
+        now_ms = int(now * 1000)
+        today = now_ms - now_ms % DAY_MS
+        if int(payload.get('endDate', now_ms)) >= today:
+            return
+        write_json_atomic(os.path.join(self.path, f"{key}.json"), {
+            'saved_at': now,
+            'expires_at': None,
+            'data': data
+        })
+
+
+def content_hash(value):
+    """sha256 of an EventTable's columns or of a JSON-able value, for content-addressed keys."""
+    digest = hashlib.sha256()
+    if isinstance(value, EventTable):
+        for column in [value.timestamp, value.model, *value.columns.values(), value.cents]:
+            digest.update(column.tobytes())
+        digest.update(json.dumps(value.models).encode("utf-8"))
+    else:
+        digest.update(json.dumps(value, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Memoized analysis results, in memory and on disk.
+
+    Keys are content addressed - a hash of the analysis version, the name
+    of the result and its inputs - so unchanged data maps to the same key
+    across runs and changed data (or analysis code) never hits a stale
+    entry. Results are pickled: the stats hold datetimes and the rollup is
+    an object. Memory keeps the ANALYSIS_MEMORY_ENTRIES most recently used
+    results; on disk the least recently used files are evicted once they
+    add up to more than max_bytes.
+    """
+
+    def __init__(self, version, path=None, max_bytes=ANALYSIS_DISK_BYTES):
+        self.version = version
+        self.path = path or os.path.join(data_dir(), "analysis")
+        self.max_bytes = max_bytes
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        os.makedirs(self.path, mode=0o700, exist_ok=True)
+
+    def key(self, name, *inputs):
+        """Key for a result computed from inputs (hashed with content_hash unless already strings)."""
+        parts = [self.version, name] + [part if isinstance(part, str) else content_hash(part) for part in inputs]
+        return hashlib.sha256("\0".join(map(str, parts)).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """The result stored under key, or None."""
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return self.memory[key]
+
+        file_path = os.path.join(self.path, f"{key}.pickle")
+        try:
+            with open(file_path, "rb") as f:
+                result = pickle.load(f)
+            os.utime(file_path)
+        except Exception:
+            # Missing, torn or written by an incompatible version - recompute
+            return None
+        self.remember(key, result)
+        return result
+
+    def put(self, key, result):
+        self.remember(key, result)
+        file_path = os.path.join(self.path, f"{key}.pickle")
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, file_path)
+        self.evict()
+
+    def remember(self, key, result):
+        with self.lock:
+            self.memory[key] = result
+            self.memory.move_to_end(key)
+            while len(self.memory) > ANALYSIS_MEMORY_ENTRIES:
+                self.memory.popitem(last=False)
+
+    def evict(self):
+        """Delete the least recently used files until the rest fit in max_bytes."""
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".pickle"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, file_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+            total -= size
+
+    def memoize(self, name, compute, *inputs):
+        """compute() for these inputs, from the cache when it has been computed before.
+
+        None results are not stored, so they are recomputed every time.
+        """
+        key = self.key(name, *inputs)
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            if result is not None:
+                self.put(key, result)
+        return result
+
+
+def snapshot_path(path=None):
+    """Where a snapshot is read from / written to when no path is given."""
+    return path or os.path.join(data_dir(), "snapshot.json")
+
+
+def save_snapshot(analytics, events, path=None):
+    """Save the raw analytics payload and usage events (an EventTable) for an offline rerun."""
+    path = snapshot_path(path)
+    write_json_atomic(path, {
+        'version': 2,
+        'saved_at': int(time.time() * 1000),
+        'analytics': analytics,
+        'event_table': events.to_json()
+    })
+    return path
+
+
+def load_snapshot(path=None):
+    """Load a snapshot saved by save_snapshot, or None if there isn't a usable one.
+
+    The usage events come back as an EventTable under 'events'.
+    """
+    data = read_json(snapshot_path(path))
+    if not data or not data.get('analytics'):
+        return None
+    data['events'] = load_event_table(data)
+    return data
+
+
+def get_keyring():
+    """Return the keyring module if it is installed, else None (imported on first use)."""
+    try:
+        import keyring
+    except ImportError:
+        return None
+    return keyring
+
+
+def token_path():
+    return os.path.join(data_dir(), "session-token")
+
+
+def save_cached_token(token):
+    """Remember the session token, in the OS keyring if possible, else a 0600 file."""
+    keyring = get_keyring()
+    if keyring:
+        try:
+            keyring.set_password(KEYRING_SERVICE, KEYRING_USERNAME, token)
+            return
+        except Exception:
+            pass
+    fd = os.open(token_path(), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+
+
+def load_cached_token():
+    """Return the saved session token, or None."""
+    keyring = get_keyring()
+    if keyring:
+        try:
+            token = keyring.get_password(KEYRING_SERVICE, KEYRING_USERNAME)
+            if token:
+                return token
+        except Exception:
+            pass
+    try:
+        with open(token_path()) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def clear_cached_token():
+    """Forget the saved session token."""
+    keyring = get_keyring()
+    if keyring:
+        try:
+            keyring.delete_password(KEYRING_SERVICE, KEYRING_USERNAME)
+        except Exception:
+            pass
+    try:
+        os.remove(token_path())
+    except OSError:
+        pass
@@ -0,0 +1,75 @@
+"""
+Reporting window
+The date range a wrapped covers - what gets fetched, analyzed and counted
+as "days in the period". Dates are whole UTC days, both ends inclusive.
+"""
+
+from datetime import date, timedelta
+
+from cursor_wrapped.columnar import DAY_MS, day_number
+
+
+class ReportWindow:
+    """An inclusive range of UTC dates."""
+
+    def __init__(self, start, end):
+        if end < start:
+            raise ValueError(f"window ends ({end}) before it starts ({start})")
+        self.start = start
+        self.end = end
+
+    @classmethod
+    def year(cls, year, today=None):
+        """A calendar year, cut off at today while it is still running."""
+        today = today or date.today()
+        return cls(date(year, 1, 1), min(date(year, 12, 31), max(today, date(year, 1, 1))))
+
+    @classmethod
+    def last_days(cls, n, today=None):
+        """The last n days, today included."""
+        today = today or date.today()
+        return cls(today - timedelta(days=n - 1), today)
+
+    @property
+    def start_ms(self):
+        """First millisecond of the window (epoch ms)."""
+        return day_number(self.start) * DAY_MS
+
+    @property
+    def end_ms(self):
+        """Last millisecond of the window (epoch ms)."""
+        return (day_number(self.end) + 1) * DAY_MS - 1
+
+    @property
+    def days(self):
+        return (self.end - self.start).days + 1
+
+    def label(self):
+        """e.g. 'Jun 01 - Dec 16, 2025' or 'Dec 01, 2024 - Feb 28, 2025'."""
+        if self.start.year == self.end.year:
+            return f"{self.start.strftime('%b %d')} - {self.end.strftime('%b %d, %Y')}"
+        return f"{self.start.strftime('%b %d, %Y')} - {self.end.strftime('%b %d, %Y')}"
+
+    def __eq__(self, other):
+        return isinstance(other, ReportWindow) and (self.start, self.end) == (other.start, other.end)
+
+    def __repr__(self):
+        return f"ReportWindow({self.start.isoformat()}, {self.end.isoformat()})"
+
+
+# The 2025 wrapped: June 1 - December 16, 2025 (199 days)
+DEFAULT_WINDOW = ReportWindow(date(2025, 6, 1), date(2025, 12, 16))
+
+
+def window_from_args(args, today=None):
+    """The window selected by --year, --last-days or --since/--until, else DEFAULT_WINDOW."""
+    today = today or date.today()
+    if args.year:
+        return ReportWindow.year(args.year, today)
+    if args.last_days:
+        return ReportWindow.last_days(args.last_days, today)
+    if args.since or args.until:
+        start = args.since or DEFAULT_WINDOW.start
+        end = args.until or (today if args.since else DEFAULT_WINDOW.end)
+        return ReportWindow(start, end)
+    return DEFAULT_WINDOW
@@ -0,0 +1,67 @@
+import random
+from datetime import timedelta
+
+import pytest
+
+from cursor_wrapped import columnar
+from cursor_wrapped.columnar import DAY_MS, day_number
+
+
+@pytest.fixture(params=['numpy', 'pure'])
+def backend(request, monkeypatch):
+    """Run a test with NumPy and again with the pure Python fallback."""
+    if request.param == 'numpy':
+        if columnar.get_numpy() is None:
+            pytest.skip("numpy not installed")
+    else:
+        monkeypatch.setattr(columnar, '_numpy', None)
+    return request.param
+
+
+@pytest.fixture
+def data_home(tmp_path, monkeypatch):
+    """A fresh CURSOR_WRAPPED_HOME for stores, checkpoints and caches."""
+    monkeypatch.setenv('CURSOR_WRAPPED_HOME', str(tmp_path))
+    return tmp_path
+
+
+def make_days(start, end, seed=0, idle=0.3):
+    """dailyMetrics days from start to end, about `idle` of them without activity."""
+    r = random.Random(seed)
+    days = []
+    d = start
+    while d <= end:
+        day = {'date': str(day_number(d) * DAY_MS)}
+        if r.random() >= idle:
+            day.update({
+                'linesAdded': r.randint(0, 400),
+                'linesDeleted': r.randint(0, 50),
+                'acceptedLinesAdded': r.randint(0, 200),
+                'agentRequests': r.randint(0, 30),
+                'totalTabsShown': r.randint(0, 90),
+                'totalTabsAccepted': r.randint(0, 40),
+                'modelUsage': [{'name': r.choice(['a', 'b', 'c']), 'count': r.randint(1, 9)}],
+            })
+        days.append(day)
+        d += timedelta(days=1)
+    return days
+
+
+def make_events(n, start, end, seed=0):
+    """n usage events spread over the days start..end, newest first."""
+    r = random.Random(seed)
+    lo, hi = day_number(start) * DAY_MS, (day_number(end) + 1) * DAY_MS - 1
+    events = [
+        {
+            'timestamp': str(r.randint(lo, hi)),
+            'model': r.choice(['a', 'b', 'c']),
+            'tokenUsage': {
+                'inputTokens': r.randint(1, 5000),
+                'outputTokens': r.randint(1, 900),
+                'cacheReadTokens': r.randint(0, 9000),
+                'totalCents': round(r.random() * 20, 2),
+            },
+        }
+        for _ in range(n)
+    ]
+    return sorted(events, key=lambda e: -int(e['timestamp']))
@@ -0,0 +1,85 @@
+import random
+from datetime import date
+
+import pytest
+
+from conftest import make_days, make_events
+from cursor_wrapped.aggregates import TokenAggregate, YearlyAggregate, aggregate_tokens_parallel, merge_runs
+from cursor_wrapped.columnar import DailyTable, EventTable
+
+
+def yearly(days):
+    return YearlyAggregate.from_table(DailyTable.from_metrics(days))
+
+
+def shards(items, r, contiguous):
+    """items split into 1-8 disjoint, non-empty groups."""
+    n = r.randint(1, min(8, len(items)))
+    if contiguous:
+        cuts = sorted(r.sample(range(1, len(items)), n - 1))
+        return [items[a:b] for a, b in zip([0] + cuts, cuts + [len(items)])]
+    groups = [[] for _ in range(n)]
+    for i, item in enumerate(items):
+        groups[i % n if i < n else r.randrange(n)].append(item)
+    return groups
+
+
+@pytest.mark.parametrize('seed', range(12))
+def test_yearly_merge_matches_single_pass_in_any_order(backend, seed):
+    r = random.Random(seed)
+    days = make_days(date(2025, 1, 1), date(2025, 4, 30), seed=seed, idle=r.choice([0.0, 0.3, 0.8]))
+    expected = yearly(days).to_stats()
+
+    parts = [yearly(part) for part in shards(days, r, contiguous=seed % 2 == 0)]
+    r.shuffle(parts)
+    folded = YearlyAggregate()
+    for part in parts:
+        folded.merge(part)
+    assert folded.to_stats() == expected
+
+    # Pairwise, as a tree, regrouped
+    while len(parts) > 1:
+        i = r.randrange(len(parts) - 1)
+        parts[i:i + 2] = [YearlyAggregate().merge(parts[i]).merge(parts[i + 1])]
+    assert parts[0].to_stats() == expected
+
+
+def test_yearly_merge_of_empty_aggregates(backend):
+    days = make_days(date(2025, 6, 1), date(2025, 6, 20))
+    expected = yearly(days).to_stats()
+    assert YearlyAggregate().merge(yearly(days)).merge(YearlyAggregate()).to_stats() == expected
+
+
+def test_merge_runs_joins_touching_runs():
+    assert merge_runs([(1, 2), (10, 1)], [(3, 4), (11, 2)]) == [(1, 6), (10, 3)]
+    with pytest.raises(ValueError):
+        merge_runs([(1, 3)], [(2, 1)])
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_token_merge_matches_single_pass(backend, seed):
+    r = random.Random(seed)
+    table = EventTable.from_events(make_events(3000, date(2025, 1, 1), date(2025, 3, 31), seed=seed))
+    expected = TokenAggregate.from_table(table).to_stats()
+
+    cuts = sorted(r.sample(range(1, len(table)), 5))
+    parts = [TokenAggregate.from_table(table.slice(a, b)) for a, b in zip([0] + cuts, cuts + [len(table)])]
+    r.shuffle(parts)
+    merged = TokenAggregate()
+    for part in parts:
+        merged.merge(part)
+    got = merged.to_stats()
+
+    for key in ('total_input_tokens', 'total_output_tokens', 'total_cache_read', 'event_count', 'model_tokens'):
+        assert got[key] == expected[key]
+    assert got['total_cost_cents'] == pytest.approx(expected['total_cost_cents'])
+    assert got['model_costs'] == pytest.approx(expected['model_costs'])
+
+
+def test_parallel_aggregate_matches_single_process():
+    events = EventTable.from_events(make_events(2000, date(2025, 1, 1), date(2025, 1, 31)))
+    expected = TokenAggregate.from_table(events).to_stats()
+    got = aggregate_tokens_parallel(events, 2, chunk_size=500).to_stats()
+    assert got['event_count'] == expected['event_count']
+    assert got['model_tokens'] == expected['model_tokens']
+    assert got['total_cost_cents'] == pytest.approx(expected['total_cost_cents'])
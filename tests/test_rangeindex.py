@@ -0,0 +1,68 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from cursor_wrapped.columnar import day_date
+from cursor_wrapped.rangeindex import INDEXED_METRICS, RangeIndex
+
+FIRST_DAY = 20000
+
+
+def random_daily(r, n):
+    """Day-level sums for n days, with active and idle stretches of random length."""
+    active = []
+    while len(active) < n:
+        active += [r.random() < 0.6] * r.randint(1, 9)
+    active = active[:n]
+    daily = {metric: [r.randint(1, 50) if a else 0 for a in active] for metric in INDEXED_METRICS}
+    daily['active_days'] = [int(a) for a in active]
+    return daily
+
+
+def brute_streak(daily, first, last):
+    """(length, first date) of the longest active run within slots first..last, earliest on ties."""
+    best, run_start, length = (0, None), None, 0
+    for i in range(max(first, 0), min(last, len(daily['active_days']) - 1) + 1):
+        if daily['active_days'][i]:
+            run_start = i if length == 0 else run_start
+            length += 1
+            if length > best[0]:
+                best = (length, day_date(FIRST_DAY + run_start))
+        else:
+            length = 0
+    return best
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_totals_and_streaks_match_brute_force(backend, seed):
+    r = random.Random(seed)
+    n = r.randint(1, 120)
+    daily = random_daily(r, n)
+    index = RangeIndex(FIRST_DAY, daily)
+    origin = day_date(FIRST_DAY)
+
+    for _ in range(300):
+        # Ranges may start before and end after the indexed days
+        lo = r.randint(-10, n + 10)
+        hi = r.randint(lo - 3, n + 10)
+        start, end = origin + timedelta(days=lo), origin + timedelta(days=hi)
+
+        slots = range(max(lo, 0), min(hi, n - 1) + 1)
+        assert index.totals(start, end) == {metric: sum(daily[metric][i] for i in slots) for metric in INDEXED_METRICS}
+        assert index.total('lines', start, end) == sum(daily['lines'][i] for i in slots)
+        assert index.longest_streak(start, end) == brute_streak(daily, lo, hi)
+
+    assert index.longest_streak() == brute_streak(daily, 0, n - 1)
+    assert index.totals()['active_days'] == sum(daily['active_days'])
+
+
+def test_empty_index():
+    index = RangeIndex(None, {})
+    assert index.totals(date(2025, 1, 1), date(2025, 12, 31)) == {metric: 0 for metric in INDEXED_METRICS}
+    assert index.longest_streak() == (0, None)
+
+
+def test_unknown_metric():
+    with pytest.raises(ValueError):
+        RangeIndex(FIRST_DAY, random_daily(random.Random(0), 10)).total('tokens')
@@ -0,0 +1,66 @@
+import random
+from bisect import bisect_left, bisect_right
+
+import pytest
+
+from cursor_wrapped.sketch import DEFAULT_COMPRESSION, QUANTILES, TDigest
+
+DISTRIBUTIONS = {
+    'uniform': lambda r: r.random(),
+    'lognormal': lambda r: r.lognormvariate(5, 2),
+    'tokens': lambda r: r.randint(1, 200_000),
+}
+
+
+def rank_error(ordered, value, q):
+    """How far (as a fraction of all values) value's rank is from q."""
+    lo = bisect_left(ordered, value) / len(ordered)
+    hi = bisect_right(ordered, value) / len(ordered)
+    return 0 if lo <= q <= hi else min(abs(lo - q), abs(hi - q))
+
+
+@pytest.mark.parametrize('distribution', DISTRIBUTIONS)
+@pytest.mark.parametrize('seed', range(3))
+def test_quantiles_after_merges_stay_within_error(backend, distribution, seed):
+    r = random.Random(seed)
+    values = [DISTRIBUTIONS[distribution](r) for _ in range(20_000)]
+
+    # Chunks of very different sizes, merged in random order
+    digests = []
+    i = 0
+    while i < len(values):
+        n = r.choice([1, 7, 100, 2500])
+        digests.append(TDigest.from_values(values[i:i + n]))
+        i += n
+    r.shuffle(digests)
+    digest = TDigest()
+    for part in digests:
+        digest.merge(part)
+
+    ordered = sorted(values)
+    assert digest.count == len(values)
+    assert (digest.min, digest.max) == (ordered[0], ordered[-1])
+    assert len(digest.means) <= DEFAULT_COMPRESSION
+    for q in QUANTILES.values():
+        assert rank_error(ordered, digest.quantile(q), q) <= 0.005
+    assert digest.quantile(0) == ordered[0]
+    assert digest.quantile(1) == ordered[-1]
+
+
+def test_merge_matches_one_batch(backend):
+    r = random.Random(0)
+    values = [r.lognormvariate(3, 1) for _ in range(5000)]
+    whole = TDigest.from_values(values)
+    merged = TDigest.from_values(values[:1234]).merge(TDigest.from_values(values[1234:]))
+    for q in QUANTILES.values():
+        assert merged.quantile(q) == pytest.approx(whole.quantile(q), rel=0.02)
+
+
+def test_empty_and_single_value(backend):
+    empty = TDigest()
+    assert empty.quantile(0.5) is None
+    assert empty.summary() == {name: None for name in QUANTILES}
+
+    single = TDigest.from_values([42]).merge(TDigest())
+    assert single.summary() == {name: 42 for name in QUANTILES}
+    assert TDigest().merge(single).summary() == {name: 42 for name in QUANTILES}
@@ -0,0 +1,142 @@
+import random
+from datetime import date
+
+import pytest
+
+from conftest import make_days, make_events
+from cursor_wrapped import main
+from cursor_wrapped.columnar import EventTable
+from cursor_wrapped.store import EventStore, FetchCheckpoint, add_range, load_snapshot, missing_ranges, save_snapshot
+from cursor_wrapped.window import ReportWindow
+
+WINDOW = ReportWindow(date(2025, 3, 1), date(2025, 3, 31))
+
+
+class FakeClient:
+    """Serves usage events and analytics days from memory; pages in fail_pages raise until cleared."""
+
+    def __init__(self, events, days=(), fail_pages=()):
+        self.events = events
+        self.days = list(days)
+        self.fail_pages = set(fail_pages)
+        self.calls = []
+
+    def post_json(self, path, payload, referer=None):
+        self.calls.append(payload)
+        start, end = int(payload['startDate']), int(payload['endDate'])
+        if path.endswith('get-user-analytics'):
+            return {'dailyMetrics': [d for d in self.days if start <= int(d['date']) <= end]}
+        if payload['page'] in self.fail_pages:
+            raise ConnectionError(f"page {payload['page']} dropped")
+        events = [e for e in self.events if start <= int(e['timestamp']) <= end]
+        first = (payload['page'] - 1) * payload['pageSize']
+        return {'totalUsageEventsCount': len(events), 'usageEventsDisplay': events[first:first + payload['pageSize']]}
+
+
+def covered(ranges):
+    return {n for lo, hi in ranges for n in range(lo, hi + 1)}
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_ranges_match_brute_force(seed):
+    r = random.Random(seed)
+    ranges, truth = [], set()
+    for _ in range(12):
+        lo = r.randint(0, 80)
+        hi = r.randint(lo, min(lo + 15, 80))
+        ranges = add_range(ranges, lo, hi)
+        truth |= set(range(lo, hi + 1))
+
+        # Sorted, disjoint and not touching, covering exactly what was added
+        assert covered(ranges) == truth
+        assert all(a[1] + 1 < b[0] for a, b in zip(ranges, ranges[1:]))
+
+        start = r.randint(-5, 85)
+        end = r.randint(start - 2, 90)
+        missing = missing_ranges(ranges, start, end)
+        assert covered(missing) == set(range(start, end + 1)) - truth
+        assert all(a[1] + 1 < b[0] for a, b in zip(missing, missing[1:]))
+
+
+def test_store_keeps_ranges_and_converts_legacy_stores(data_home):
+    store = EventStore('acct').load()
+    assert store.missing_event_ranges(WINDOW.start_ms, WINDOW.end_ms) == [(WINDOW.start_ms, WINDOW.end_ms)]
+
+    store.merge_events(make_events(200, WINDOW.start, WINDOW.end))
+    store.mark_events_fetched(WINDOW.start_ms, WINDOW.end_ms)
+    store.save()
+    store = EventStore('acct').load()
+    assert len(store.events) == 200
+    assert store.missing_event_ranges(WINDOW.start_ms, WINDOW.end_ms) == []
+
+    # Saved before ranges were recorded: only the span of the stored events counts as fetched
+    store.event_ranges = None
+    store.save()
+    legacy = EventStore('acct').load()
+    timestamps = legacy.events.timestamp
+    assert legacy.event_ranges == [[min(timestamps), max(timestamps)]]
+
+
+def test_checkpoint_resumes_with_its_pages_and_end(data_home):
+    checkpoint = FetchCheckpoint('acct', '1', 'open').load()
+    assert checkpoint.freeze(5000) == '5000'
+    checkpoint.record(1, {'totalUsageEventsCount': 3, 'usageEventsDisplay': [{'timestamp': '4'}]})
+    checkpoint.record(3, {'totalUsageEventsCount': 3, 'usageEventsDisplay': [{'timestamp': '2'}]})
+
+    resumed = FetchCheckpoint('acct', '1', 'open').load()
+    assert sorted(resumed.pages) == [1, 3]
+    assert resumed.freeze(9000) == '5000'
+
+    resumed.clear()
+    assert FetchCheckpoint('acct', '1', 'open').load().pages == {}
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_fetch_resumes_after_a_lost_page(data_home, workers):
+    events = make_events(main.USAGE_PAGE_SIZE * 4 + 17, WINDOW.start, WINDOW.end)
+    client = FakeClient(events, fail_pages={3})
+    with pytest.raises(main.IncompleteFetchError) as failed:
+        main.fetch_token_usage('token', workers=workers, client=client, account='acct', into=EventTable(),
+                               window=WINDOW, on_progress=lambda *args: None)
+    assert failed.value.failed_pages == [3]
+    fetched_before = {call['page'] for call in client.calls} - {3}
+
+    client.fail_pages.clear()
+    client.calls.clear()
+    fetched = main.fetch_token_usage('token', workers=workers, client=client, account='acct', into=EventTable(),
+                                     window=WINDOW, on_progress=lambda *args: None)
+    # Pages that arrived before the failure come from the checkpoint
+    requested = [call['page'] for call in client.calls]
+    assert 3 in requested and not fetched_before & set(requested)
+    assert fetched.to_json() == EventTable.from_events(events).to_json()
+    assert not list(data_home.glob('checkpoint-*'))
+
+
+def test_sync_fetches_only_missing_ranges(data_home):
+    events = make_events(300, date(2025, 1, 1), date(2025, 4, 30))
+    client = FakeClient(events, make_days(date(2025, 1, 1), date(2025, 4, 30)))
+    store = EventStore('acct').load()
+    main.sync_token_usage('token', client, store, on_progress=lambda *args: None, window=WINDOW)
+
+    # A wider window only asks for the days around the one already fetched;
+    # the later stretch starts at the newest stored event, for late arrivals
+    client.calls.clear()
+    hwm = store.events_high_water_mark()
+    wider = ReportWindow(date(2025, 2, 1), date(2025, 4, 15))
+    main.sync_token_usage('token', client, store, on_progress=lambda *args: None, window=wider)
+    requested = {(int(call['startDate']), int(call['endDate'])) for call in client.calls}
+    assert requested == {(wider.start_ms, WINDOW.start_ms - 1), (hwm, wider.end_ms)}
+
+    expected = sorted((int(e['timestamp']) for e in events if wider.start_ms <= int(e['timestamp']) <= wider.end_ms),
+                      reverse=True)
+    assert list(store.events.timestamp) == expected
+
+
+def test_snapshot_round_trip(data_home):
+    analytics = {'dailyMetrics': make_days(WINDOW.start, WINDOW.end)}
+    events = EventTable.from_events(make_events(50, WINDOW.start, WINDOW.end))
+    path = save_snapshot(analytics, events)
+    snapshot = load_snapshot(path)
+    assert snapshot['analytics'] == analytics
+    assert snapshot['events'].to_json() == events.to_json()
+    assert load_snapshot(str(data_home / 'missing.json')) is None